@@ -3,26 +3,730 @@
 Менеджер расширений Scene Server
 Управляет загрузкой, инициализацией и API расширений
 """
+import itertools
 import json
+import multiprocessing
+import os
+import re
+import statistics
+import struct
 import sys
+import tempfile
+import threading
 import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
-from typing import Dict, Any, Optional, List
-from flask import Flask, Blueprint, jsonify, request
+from typing import Dict, Any, Optional, List, Tuple
+from flask import Flask, Blueprint, Response, g, jsonify, request
 from flask_cors import CORS
+from multiprocessing.connection import Client, Listener
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import HTTP_STATUS_CODES
+from werkzeug.routing import Map, Rule
+from werkzeug.test import Client as WSGIClient
+from werkzeug.wrappers import Request
 import importlib.util
 
+def run_wsgi_server(app, host: str, port: int, production: bool = False,
+                    threads: int = 8, keep_alive: int = 120):
+    """Запуск WSGI приложения
+    
+    production=True - многопоточный waitress с keep-alive соединениями,
+    иначе встроенный сервер разработки Flask.
+    """
+    if production:
+        try:
+            from waitress import serve
+        except ImportError:
+            print("⚠️ waitress is not installed, falling back to the Flask dev server")
+            print("   Please install: pip install waitress")
+        else:
+            print(f"🚀 Production server on {host}:{port} ({threads} threads, keep-alive {keep_alive}s)")
+            serve(
+                app,
+                host=host,
+                port=port,
+                threads=threads,
+                channel_timeout=keep_alive,
+                ident='NovelRuntime'
+            )
+            return
+    
+    app.run(host=host, port=port, debug=False, use_reloader=False, threaded=True)
+
+# Схема manifest.json: поле -> (допустимые типы, обязательное)
+MANIFEST_SCHEMA = {
+    'name': ((str,), True),
+    'version': ((str,), False),
+    'description': ((str,), False),
+    'author': ((str,), False),
+    'dependencies': ((dict,), False),
+    'api_prefix': ((str,), False),
+    'enabled': ((bool,), False),
+    'auto_start': ((bool,), False),
+    'lazy': ((bool,), False),
+    'isolated': ((bool,), False),
+}
+DEPENDENCIES_SCHEMA = {
+    'python': ((str,), False),
+    'packages': ((list,), False),
+    'extensions': ((list,), False),
+}
+
+def _check_fields(data: dict, schema: dict, path: str = '') -> List[str]:
+    errors = []
+    for field, (types, required) in schema.items():
+        if field not in data:
+            if required:
+                errors.append(f"missing required field '{path}{field}'")
+            continue
+        if not isinstance(data[field], types):
+            expected = ' or '.join(t.__name__ for t in types)
+            errors.append(f"'{path}{field}' must be {expected}, got {type(data[field]).__name__}")
+    return errors
+
+def validate_manifest(manifest: Any) -> List[str]:
+    """Проверка манифеста по схеме, список ошибок (пустой - манифест корректен)"""
+    if not isinstance(manifest, dict):
+        return ['manifest must be a JSON object']
+    
+    errors = _check_fields(manifest, MANIFEST_SCHEMA)
+    dependencies = manifest.get('dependencies')
+    if isinstance(dependencies, dict):
+        errors += _check_fields(dependencies, DEPENDENCIES_SCHEMA, 'dependencies.')
+        for field in ('packages', 'extensions'):
+            items = dependencies.get(field)
+            if isinstance(items, list) and not all(isinstance(item, str) for item in items):
+                errors.append(f"'dependencies.{field}' must be a list of strings")
+    
+    prefix = manifest.get('api_prefix')
+    if isinstance(prefix, str) and not prefix.startswith('/'):
+        errors.append("'api_prefix' must start with '/'")
+    return errors
+
+class ManifestRegistry:
+    """Кэш манифестов расширений
+    
+    Папка расширений обходится один раз, манифесты разбираются и проверяются
+    по схеме один раз на версию файла. Изменения отслеживаются по mtime,
+    но не чаще раза в check_interval секунд.
+    """
+    
+    def __init__(self, extensions_dir: Path, check_interval: float = 1.0):
+        self.extensions_dir = Path(extensions_dir)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        
+        # Список расширений и mtime папок, по которым он построен
+        self._names: Optional[List[str]] = None
+        self._dir_mtimes: Dict[Path, int] = {}
+        self._names_checked = 0.0
+        
+        # {расширение: (mtime_ns, манифест или None, ошибки, время проверки)}
+        self._entries: Dict[str, Tuple[Optional[int], Optional[dict], List[str], float]] = {}
+    
+    @staticmethod
+    def _is_extension_dir(path: Path) -> bool:
+        return path.name != '__pycache__' and not path.name.startswith('_')
+    
+    @staticmethod
+    def _mtime(path: Path) -> Optional[int]:
+        try:
+            return path.stat().st_mtime_ns
+        except OSError:
+            return None
+    
+    def _scan(self) -> List[str]:
+        """Один проход по папке: расширения верхнего уровня и во вложенных папках"""
+        top_level, nested = [], []
+        self._dir_mtimes = {self.extensions_dir: self._mtime(self.extensions_dir)}
+        if not self.extensions_dir.is_dir():
+            return []
+        
+        for subdir in self.extensions_dir.iterdir():
+            if not subdir.is_dir() or not self._is_extension_dir(subdir):
+                continue
+            self._dir_mtimes[subdir] = self._mtime(subdir)
+            if (subdir / 'manifest.json').exists():
+                top_level.append(subdir.name)
+            for ext_dir in subdir.iterdir():
+                if not ext_dir.is_dir() or ext_dir.name == '__pycache__':
+                    continue
+                self._dir_mtimes[ext_dir] = self._mtime(ext_dir)
+                if (ext_dir / 'manifest.json').exists():
+                    nested.append(f"{subdir.name}/{ext_dir.name}")
+        return top_level + nested
+    
+    def discover(self) -> List[str]:
+        """Имена доступных расширений; папка пересканируется, если изменилась"""
+        with self._lock:
+            now = time.monotonic()
+            if self._names is not None and now - self._names_checked < self.check_interval:
+                return list(self._names)
+            # Новая папка или manifest.json меняют mtime папки, в которой появились
+            if self._names is None or any(self._mtime(path) != mtime for path, mtime in self._dir_mtimes.items()):
+                self._names = self._scan()
+            self._names_checked = now
+            return list(self._names)
+    
+    def _entry(self, extension_name: str):
+        now = time.monotonic()
+        entry = self._entries.get(extension_name)
+        if entry is not None and now - entry[3] < self.check_interval:
+            return entry
+        
+        manifest_path = self.extensions_dir / extension_name / 'manifest.json'
+        mtime = self._mtime(manifest_path)
+        if entry is not None and entry[0] == mtime:
+            entry = (entry[0], entry[1], entry[2], now)
+        elif mtime is None:
+            entry = (None, None, ['manifest.json not found'], now)
+        else:
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                errors = validate_manifest(manifest)
+            except (OSError, ValueError) as e:
+                manifest, errors = None, [f"invalid JSON: {e}"]
+            if errors:
+                print(f"❌ Invalid manifest for {extension_name}: {'; '.join(errors)}")
+                manifest = None
+            entry = (mtime, manifest, errors, now)
+        self._entries[extension_name] = entry
+        return entry
+    
+    def get(self, extension_name: str) -> Optional[dict]:
+        """Разобранный манифест (общий объект, не изменять) или None"""
+        with self._lock:
+            return self._entry(extension_name)[1]
+    
+    def errors(self, extension_name: str) -> List[str]:
+        """Ошибки манифеста расширения"""
+        with self._lock:
+            return list(self._entry(extension_name)[2])
+    
+    def invalid(self) -> Dict[str, List[str]]:
+        """Расширения с некорректными манифестами"""
+        invalid = {}
+        for extension_name in self.discover():
+            errors = self.errors(extension_name)
+            if errors:
+                invalid[extension_name] = errors
+        return invalid
+
+class RouteStats:
+    """Маршрут расширения и его счетчики: запросы, ошибки, задержка"""
+    
+    def __init__(self, endpoint: str, url: str, methods: List[str], window: int = 256):
+        self.endpoint = endpoint
+        self.url = url
+        self.methods = sorted(methods)
+        self.count = 0
+        self.errors = 0  # Ответы 5xx
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._recent = deque(maxlen=window)  # Последние задержки для перцентилей
+        self._lock = threading.Lock()
+    
+    def record(self, elapsed_ms: float, status: int):
+        with self._lock:
+            self.count += 1
+            if status >= 500:
+                self.errors += 1
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+            self._recent.append(elapsed_ms)
+    
+    def to_dict(self) -> dict:
+        with self._lock:
+            recent = sorted(self._recent)
+            count, errors, total_ms, max_ms = self.count, self.errors, self.total_ms, self.max_ms
+        
+        def percentile(fraction):
+            return round(recent[min(len(recent) - 1, int(len(recent) * fraction))], 3) if recent else 0.0
+        
+        return {
+            'endpoint': self.endpoint,
+            'url': self.url,
+            'methods': self.methods,
+            'requests': count,
+            'errors': errors,
+            'avg_ms': round(total_ms / count, 3) if count else 0.0,
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+            'max_ms': round(max_ms, 3)
+        }
+
+class ExtensionDispatcher:
+    """WSGI прослойка: запросы под api_prefix расширения уходят в его приложение
+    
+    Flask запрещает регистрировать blueprint после первого запроса, поэтому
+    каждое расширение монтируется в собственное маленькое Flask приложение,
+    и сервер может принимать запросы до окончания загрузки расширений.
+    """
+    
+    def __init__(self, wsgi_app, manager: 'ExtensionManager'):
+        self.wsgi_app = wsgi_app
+        self.manager = manager
+    
+    def __call__(self, environ, start_response):
+        extension_name = self.manager.match_prefix(environ.get('PATH_INFO', ''))
+        if extension_name is None:
+            return self.wsgi_app(environ, start_response)
+        
+        ext_app = self.manager.apps.get(extension_name)
+        if ext_app is None and self.manager.is_lazy(extension_name):
+            # Первый запрос к ленивому расширению: загрузка прямо сейчас,
+            # параллельные запросы ждут ту же загрузку
+            self.manager.activate(extension_name)
+            ext_app = self.manager.apps.get(extension_name)
+        if ext_app is not None:
+            return ext_app(environ, start_response)
+        return self.manager.unavailable_response(extension_name, environ)(environ, start_response)
+
+def import_extension_class(extensions_dir: Path, extension_name: str) -> Optional[type]:
+    """Импорт main.py расширения и поиск класса *Extension"""
+    ext_path = Path(extensions_dir) / extension_name
+    
+    # Добавляем путь к расширению в sys.path
+    if str(ext_path.parent) not in sys.path:
+        sys.path.insert(0, str(ext_path.parent))
+    
+    # Импортируем модуль
+    spec = importlib.util.spec_from_file_location(
+        extension_name.replace('/', '.'),
+        ext_path / 'main.py'
+    )
+    if not spec or not spec.loader:
+        return None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    
+    # Ищем класс расширения
+    for attr_name in dir(module):
+        attr = getattr(module, attr_name)
+        if (isinstance(attr, type) and
+            attr_name.endswith('Extension') and
+            attr_name != 'Extension'):
+            return attr
+    return None
+
+# ====== Изоляция расширений в дочерних процессах ======
+#
+# Запросы передаются по локальному сокету (AF_UNIX, на Windows - именованный
+# канал) кадрами multiprocessing.connection с бинарным заголовком:
+#   запрос: тип, id, длины метода, пути, query, заголовков, тела + данные
+#   ответ:  тип, id, статус, длины заголовков, тела + данные
+# Заголовки - строки "Имя: значение" через \n в latin-1.
+
+MSG_REQUEST = 1
+MSG_RESPONSE = 2
+MSG_PING = 3
+MSG_HOOK = 4  # Вызов метода расширения: имя в поле метода, аргументы JSON в теле
+
+_REQUEST_HEADER = struct.Struct('!BIBIIII')
+_RESPONSE_HEADER = struct.Struct('!BIHII')
+
+def _encode_headers(headers) -> bytes:
+    return '\n'.join(f"{name}: {value}" for name, value in headers).encode('latin-1')
+
+def _decode_headers(data: bytes) -> List[Tuple[str, str]]:
+    if not data:
+        return []
+    return [tuple(line.split(': ', 1)) for line in data.decode('latin-1').split('\n')]
+
+def encode_request(kind: int, request_id: int, method: str = '', path: str = '',
+                   query: bytes = b'', headers=(), body: bytes = b'') -> bytes:
+    method_data = method.encode('ascii')
+    path_data = path.encode('utf-8')
+    headers_data = _encode_headers(headers)
+    return b''.join((
+        _REQUEST_HEADER.pack(kind, request_id, len(method_data), len(path_data),
+                             len(query), len(headers_data), len(body)),
+        method_data, path_data, query, headers_data, body
+    ))
+
+def decode_request(frame: bytes):
+    """(тип, id, метод, путь, query, заголовки, тело)"""
+    kind, request_id, *lengths = _REQUEST_HEADER.unpack_from(frame)
+    fields = []
+    offset = _REQUEST_HEADER.size
+    for length in lengths:
+        fields.append(frame[offset:offset + length])
+        offset += length
+    method, path, query, headers, body = fields
+    return kind, request_id, method.decode('ascii'), path.decode('utf-8'), query, _decode_headers(headers), body
+
+def encode_response(request_id: int, status: int, headers=(), body: bytes = b'') -> bytes:
+    headers_data = _encode_headers(headers)
+    return b''.join((
+        _RESPONSE_HEADER.pack(MSG_RESPONSE, request_id, status, len(headers_data), len(body)),
+        headers_data, body
+    ))
+
+def decode_response(frame: bytes):
+    """(id, статус, заголовки, тело)"""
+    _, request_id, status, headers_length, body_length = _RESPONSE_HEADER.unpack_from(frame)
+    offset = _RESPONSE_HEADER.size
+    headers = _decode_headers(frame[offset:offset + headers_length])
+    body = frame[offset + headers_length:offset + headers_length + body_length]
+    return request_id, status, headers, body
+
+def _ipc_address(extension_name: str) -> Tuple[str, str]:
+    """Адрес и семейство локального канала для процесса расширения"""
+    token = f"{re.sub(r'[^A-Za-z0-9]', '_', extension_name)}-{uuid.uuid4().hex[:12]}"
+    if sys.platform == 'win32':
+        return rf'\\.\pipe\novelruntime-{token}', 'AF_PIPE'
+    return os.path.join(tempfile.gettempdir(), f'novelruntime-{token}.sock'), 'AF_UNIX'
+
+def _serve_ipc_connection(app: Flask, extension, conn):
+    """Обработка кадров одного соединения в процессе расширения"""
+    client = app.test_client(use_cookies=False)
+    with conn:
+        while True:
+            try:
+                frame = conn.recv_bytes()
+            except (EOFError, OSError):
+                return
+            kind, request_id, method, path, query, headers, body = decode_request(frame)
+            
+            if kind == MSG_PING:
+                conn.send_bytes(encode_response(request_id, 200))
+                continue
+            
+            if kind == MSG_HOOK:
+                hook = getattr(extension, method, None)
+                status = 404
+                if callable(hook):
+                    try:
+                        hook(*json.loads(body or b'[]'))
+                        status = 200
+                    except Exception as e:
+                        print(f"⚠️ Hook {method} failed: {e}")
+                        status = 500
+                conn.send_bytes(encode_response(request_id, status))
+                continue
+            
+            headers = [(name, value) for name, value in headers if name.lower() != 'content-length']
+            try:
+                response = client.open(path, method=method, query_string=query.decode('latin-1'),
+                                       headers=headers, data=body)
+                reply = encode_response(
+                    request_id, response.status_code, response.headers.items(), response.get_data()
+                )
+            except Exception as e:
+                print(f"⚠️ Request {method} {path} failed: {e}")
+                reply = encode_response(request_id, 500)
+            conn.send_bytes(reply)
+
+def _isolated_worker(extensions_dir: str, extension_name: str, address: str, family: str,
+                     authkey: bytes, control):
+    """Точка входа дочернего процесса расширения"""
+    try:
+        ext_class = import_extension_class(Path(extensions_dir), extension_name)
+        if ext_class is None:
+            control.send(('error', f"No extension class found in {extension_name}"))
+            return
+        extension = ext_class()
+        if not extension.initialize():
+            control.send(('error', f"Failed to initialize extension '{extension_name}'"))
+            return
+        
+        app = Flask(__name__, static_folder=None)
+        bp = extension.get_blueprint() if hasattr(extension, 'get_blueprint') else None
+        if bp:
+            app.register_blueprint(bp)
+        routes = [
+            (rule.endpoint, rule.rule, sorted(rule.methods))
+            for rule in app.url_map.iter_rules()
+            if bp and rule.endpoint.startswith(bp.name + '.')
+        ]
+    except Exception as e:
+        control.send(('error', f"{type(e).__name__}: {e}"))
+        return
+    
+    listener = Listener(address, family, authkey=authkey)
+    control.send(('ready', routes, bp.url_prefix if bp else None, getattr(extension, 'version', 'unknown')))
+    
+    # Родительский процесс закрыл управляющий канал - завершаемся
+    def watch_parent():
+        try:
+            control.recv()
+        except (EOFError, OSError):
+            pass
+        os._exit(0)
+    threading.Thread(target=watch_parent, daemon=True).start()
+    
+    while True:
+        conn = listener.accept()
+        threading.Thread(target=_serve_ipc_connection, args=(app, extension, conn), daemon=True).start()
+
+class IsolatedExtension:
+    """Расширение в дочернем процессе
+    
+    Для диспетчера - WSGI приложение, пересылающее запросы в процесс
+    расширения. Упавший процесс перезапускается с нарастающей паузой,
+    на время перезапуска маршруты отвечают 503.
+    """
+    
+    def __init__(self, manager: 'ExtensionManager', extension_name: str,
+                 pool_size: int = 8, start_timeout: float = 60.0):
+        self.manager = manager
+        self.name = extension_name
+        self.version = 'unknown'
+        self.pool_size = pool_size
+        self.start_timeout = start_timeout
+        self.url_prefix = None
+        self.routes: Dict[str, RouteStats] = {}
+        self.restarts = 0
+        self.alive = False
+        
+        self.process = None
+        self.address = None
+        self.family = None
+        self._authkey = os.urandom(16)
+        self._control = None
+        self._idle: List[Any] = []  # Пул свободных соединений
+        self._pool_lock = threading.Lock()
+        self._generation = 0
+        self._request_ids = itertools.count(1)
+        self._url_map = Map()
+        self._stopping = False
+        self._monitor_thread = None
+    
+    def start(self) -> bool:
+        """Запуск процесса и ожидание инициализации расширения"""
+        ctx = multiprocessing.get_context('spawn')
+        address, family = _ipc_address(self.name)
+        control, child_control = ctx.Pipe()
+        process = ctx.Process(
+            target=_isolated_worker,
+            args=(str(self.manager.extensions_dir), self.name, address, family, self._authkey, child_control),
+            name=f'extension-{self.name}',
+            daemon=True
+        )
+        process.start()
+        child_control.close()
+        
+        message = None
+        try:
+            if control.poll(self.start_timeout):
+                message = control.recv()
+        except (EOFError, OSError):
+            pass
+        if not message or message[0] != 'ready':
+            print(f"❌ Isolated extension '{self.name}' failed to start: {message[1] if message else 'no response'}")
+            self._stop_process(process, timeout=0)
+            control.close()
+            if family == 'AF_UNIX':
+                try:
+                    os.unlink(address)
+                except OSError:
+                    pass
+            return False
+        
+        _, routes, self.url_prefix, self.version = message
+        if not self.routes:
+            self.routes = {endpoint: RouteStats(endpoint, rule, methods) for endpoint, rule, methods in routes}
+            self._url_map = Map([Rule(rule, endpoint=endpoint, methods=methods) for endpoint, rule, methods in routes])
+        
+        with self._pool_lock:
+            self._generation += 1
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+        self.process, self.address, self.family, self._control = process, address, family, control
+        self.alive = True
+        
+        if self._monitor_thread is None:
+            self._monitor_thread = threading.Thread(target=self._monitor, daemon=True)
+            self._monitor_thread.start()
+        print(f"🧩 Extension '{self.name}' running in process {process.pid}")
+        return True
+    
+    def _monitor(self):
+        """Перезапуск упавшего процесса"""
+        delay = 1.0
+        while not self._stopping:
+            process = self.process
+            process.join()
+            if self._stopping:
+                return
+            
+            self.alive = False
+            self.manager.states[self.name] = 'restarting'
+            self._cleanup_address()
+            print(f"💥 Isolated extension '{self.name}' exited with code {process.exitcode}, restarting...")
+            while not self._stopping:
+                time.sleep(delay)
+                if self.start():
+                    self.restarts += 1
+                    self.manager.states[self.name] = 'ready'
+                    delay = 1.0
+                    break
+                delay = min(delay * 2, 30.0)
+    
+    def _cleanup_address(self):
+        if self.family == 'AF_UNIX' and self.address:
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+    
+    def _call(self, frame: bytes, request_id: int):
+        """Отправка кадра и ожидание ответа по свободному соединению пула"""
+        with self._pool_lock:
+            generation = self._generation
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = Client(self.address, self.family, authkey=self._authkey)
+        
+        try:
+            conn.send_bytes(frame)
+            reply = decode_response(conn.recv_bytes())
+        except BaseException:
+            conn.close()
+            raise
+        if reply[0] != request_id:
+            conn.close()
+            raise ConnectionError(f"Unexpected response id {reply[0]}, expected {request_id}")
+        
+        with self._pool_lock:
+            if generation == self._generation and len(self._idle) < self.pool_size:
+                self._idle.append(conn)
+                conn = None
+        if conn is not None:
+            conn.close()
+        return reply[1:]
+    
+    def _next_id(self) -> int:
+        return next(self._request_ids) & 0xFFFFFFFF
+    
+    def request(self, method: str, path: str, query: bytes = b'', headers=(), body: bytes = b''):
+        """HTTP запрос к расширению: (статус, заголовки, тело)"""
+        request_id = self._next_id()
+        return self._call(encode_request(MSG_REQUEST, request_id, method, path, query, headers, body), request_id)
+    
+    def ping(self) -> int:
+        """Пустой вызов: чистая задержка IPC"""
+        request_id = self._next_id()
+        return self._call(encode_request(MSG_PING, request_id), request_id)[0]
+    
+    def _hook(self, name: str, *args):
+        if not self.alive:
+            return
+        request_id = self._next_id()
+        try:
+            self._call(encode_request(MSG_HOOK, request_id, name, body=json.dumps(args).encode('utf-8')), request_id)
+        except (EOFError, OSError, ConnectionError) as e:
+            print(f"⚠️ Hook {name} for '{self.name}' failed: {e}")
+    
+    def prefetch_sounds(self, sounds: List[str]):
+        self._hook('prefetch_sounds', list(sounds))
+    
+    def on_files_changed(self, changes: List[tuple]):
+        self._hook('on_files_changed', [list(change) for change in changes])
+    
+    def __call__(self, environ, start_response):
+        if not self.alive:
+            return self.manager.unavailable_response(self.name, environ)(environ, start_response)
+        
+        request = Request(environ)
+        started = time.perf_counter()
+        try:
+            status, headers, body = self.request(
+                request.method, request.path, request.query_string,
+                list(request.headers.items()), request.get_data()
+            )
+        except (EOFError, OSError, ConnectionError) as e:
+            # Процесс упал во время запроса, монитор его перезапустит
+            status = 502
+            headers = [('Content-Type', 'application/json')]
+            body = json.dumps({'success': False, 'error': f"Extension '{self.name}' crashed: {e!r}"}).encode('utf-8')
+        
+        try:
+            endpoint, _ = self._url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            endpoint = None
+        if endpoint in self.routes:
+            self.routes[endpoint].record((time.perf_counter() - started) * 1000, status)
+        
+        headers = [(name, value) for name, value in headers
+                   if not name.lower().startswith('access-control-')]
+        headers += list(self.manager.cors_headers().items())
+        start_response(f"{status} {HTTP_STATUS_CODES.get(status, 'UNKNOWN')}", headers)
+        return [body]
+    
+    def shutdown(self):
+        self._stopping = True
+        self.alive = False
+        with self._pool_lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+        if self._control is not None:
+            self._control.close()
+        if self.process is not None:
+            self._stop_process(self.process, timeout=2)
+        self._cleanup_address()
+    
+    @staticmethod
+    def _stop_process(process, timeout: float):
+        """Дождаться выхода процесса, иначе terminate, затем kill; всегда с join - без зомби"""
+        process.join(timeout=timeout)
+        if process.is_alive():
+            process.terminate()
+            process.join(timeout=2)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
 class ExtensionManager:
     """Менеджер расширений"""
     
-    def __init__(self, extensions_dir: Path, base_dir: Path = None):
+    def __init__(self, extensions_dir: Path, base_dir: Path = None,
+                 app: Optional[Flask] = None, port: int = 5001, lazy: bool = False,
+                 isolate: bool = False):
         self.extensions_dir = Path(extensions_dir)
         self.base_dir = base_dir or Path.cwd()
         self.extensions: Dict[str, Any] = {}
-        self.manager_app = Flask(__name__)
+        self.manifests = ManifestRegistry(self.extensions_dir)
+        # Состояние загрузки: pending, lazy, loading, ready, restarting, failed, disabled
+        self.states: Dict[str, str] = {}
+        
+        # Ленивые расширения импортируются при первом запросе под их api_prefix.
+        # lazy=True - все расширения с api_prefix, иначе "lazy": true в манифесте
+        self.lazy = lazy
+        self._lazy: set = set()
+        self._activations: Dict[str, Future] = {}
+        self._activation_lock = threading.Lock()
+        self.apps: Dict[str, Flask] = {}  # Приложения с blueprint'ами расширений
+        self.routes: Dict[str, Dict[str, RouteStats]] = {}  # {расширение: {endpoint: маршрут}}
+        self._prefixes: List[tuple] = []  # [(api_prefix, расширение)], длинные первыми
+        self._prefix_lock = threading.Lock()
+        self.max_load_workers = 8
         
+        # isolate=True - каждое расширение в своем процессе, иначе "isolated": true в манифесте
+        self.isolate = isolate
+        
+        # Если передано приложение сцен, API расширений монтируется в него:
+        # один порт, один origin, без CORS preflight запросов
+        self.shared_app = app is not None
+        self.manager_app = app if app is not None else Flask(__name__)
+        if not self.shared_app:
+            self._setup_cors(self.manager_app)
+        self.manager_app.wsgi_app = ExtensionDispatcher(self.manager_app.wsgi_app, self)
+        
+        self.extension_port = port
+        self._setup_manager_routes()
+        self.running = False
+    
+    def _setup_cors(self, app: Flask):
+        """Настройка CORS для отдельного порта API"""
         # ====== ВАЖНО: Настройка CORS ======
-        CORS(self.manager_app, resources={
+        CORS(app, resources={
             r"/*": {
                 "origins": "*",
                 "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
@@ -32,16 +736,12 @@ class ExtensionManager:
         })
         
         # Добавляем CORS заголовки ко всем ответам
-        @self.manager_app.after_request
+        @app.after_request
         def after_request(response):
             response.headers.add('Access-Control-Allow-Origin', '*')
             response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
             response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
             return response
-        
-        self.extension_port = 5001
-        self._setup_manager_routes()
-        self.running = False
     
     def _setup_manager_routes(self):
         """Настройка API менеджера расширений"""
@@ -51,27 +751,16 @@ class ExtensionManager:
         def list_extensions():
             """Список всех расширений"""
             extensions_info = []
-            for name, ext in self.extensions.items():
-                info = {
+            for name in dict.fromkeys(list(self.extensions) + list(self.states)):
+                ext = self.extensions.get(name)
+                # Таблица маршрутов строится при регистрации blueprint'а
+                extensions_info.append({
                     'name': name,
                     'version': getattr(ext, 'version', 'unknown'),
-                    'initialized': hasattr(ext, 'initialized') and True,
-                    'routes': []
-                }
-                
-                if hasattr(ext, 'get_blueprint'):
-                    bp = ext.get_blueprint()
-                    if bp:
-                        # Получаем правила маршрутизации
-                        for rule in self.manager_app.url_map.iter_rules():
-                            if rule.blueprint == 'vvoid':
-                                info['routes'].append({
-                                    'endpoint': rule.endpoint,
-                                    'url': rule.rule,
-                                    'methods': list(rule.methods)
-                                })
-                
-                extensions_info.append(info)
+                    'state': self.states.get(name, 'ready'),
+                    'initialized': ext is not None,
+                    'routes': [route.to_dict() for route in self.routes.get(name, {}).values()]
+                })
             
             return jsonify(extensions_info)
         
@@ -82,106 +771,214 @@ class ExtensionManager:
                 'running': self.running,
                 'port': self.extension_port,
                 'loaded_extensions': list(self.extensions.keys()),
-                'available_extensions': self.discover_extensions()
+                'states': dict(self.states),
+                'available_extensions': self.discover_extensions(),
+                'invalid_manifests': self.manifests.invalid()
             })
         
         self.manager_app.register_blueprint(main_bp)
     
     def discover_extensions(self) -> List[str]:
-        """Поиск доступных расширений"""
-        extensions = []
-        if self.extensions_dir.exists():
-            # Поиск в поддиректориях
-            for ext_dir in self.extensions_dir.iterdir():
-                if ext_dir.is_dir() and ext_dir.name != '__pycache__' and not ext_dir.name.startswith('_'):
-                    manifest_path = ext_dir / 'manifest.json'
-                    if manifest_path.exists():
-                        extensions.append(ext_dir.name)
-            
-            # Также проверяем директории внутри подпапок
-            for subdir in self.extensions_dir.iterdir():
-                if subdir.is_dir() and subdir.name != '__pycache__' and not subdir.name.startswith('_'):
-                    for ext_dir in subdir.iterdir():
-                        if ext_dir.is_dir() and ext_dir.name != '__pycache__':
-                            manifest_path = ext_dir / 'manifest.json'
-                            if manifest_path.exists():
-                                extensions.append(f"{subdir.name}/{ext_dir.name}")
-        
-        return extensions
+        """Поиск доступных расширений (из кэша реестра манифестов)"""
+        return self.manifests.discover()
     
     def load_manifest(self, extension_name: str) -> Optional[dict]:
-        """Загрузка манифеста расширения"""
-        manifest_path = self.extensions_dir / extension_name / 'manifest.json'
-        if manifest_path.exists():
-            with open(manifest_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        """Загрузка манифеста расширения (разобранный и проверенный по схеме)"""
+        return self.manifests.get(extension_name)
+    
+    def match_prefix(self, path: str) -> Optional[str]:
+        """Расширение, которому принадлежит путь запроса"""
+        for prefix, extension_name in self._prefixes:
+            if path == prefix or path.startswith(prefix + '/'):
+                return extension_name
         return None
     
+    def _set_prefix(self, extension_name: str, prefix: Optional[str]):
+        """Назначение api_prefix расширению (None - снять)"""
+        with self._prefix_lock:
+            prefixes = [item for item in self._prefixes if item[1] != extension_name]
+            if prefix:
+                prefixes.append(('/' + prefix.strip('/'), extension_name))
+            prefixes.sort(key=lambda item: len(item[0]), reverse=True)
+            self._prefixes = prefixes
+    
+    def is_lazy(self, extension_name: str) -> bool:
+        """Расширение ждет активации первым запросом"""
+        return extension_name in self._lazy and self.states.get(extension_name) in ('lazy', 'loading')
+    
+    def activate(self, extension_name: str, _chain: tuple = ()) -> bool:
+        """Загрузка расширения вместе с его зависимостями, один раз
+        
+        Параллельные вызовы для одного расширения ждут общую загрузку.
+        """
+        with self._activation_lock:
+            if self.states.get(extension_name) == 'ready':
+                return True
+            future = self._activations.get(extension_name)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._activations[extension_name] = future
+        
+        if not owner:
+            return future.result()
+        
+        try:
+            manifest = self.load_manifest(extension_name) or {}
+            loaded = True
+            for dep in manifest.get('dependencies', {}).get('extensions', []):
+                if dep in _chain + (extension_name,):
+                    print(f"❌ Extension '{extension_name}' skipped: circular dependency")
+                    loaded = False
+                elif self.states.get(dep) != 'ready' and not (dep in self._lazy and self.activate(dep, _chain + (extension_name,))):
+                    print(f"❌ Extension '{extension_name}' skipped: dependency '{dep}' unavailable")
+                    loaded = False
+                if not loaded:
+                    self.states[extension_name] = 'failed'
+                    break
+            if loaded:
+                loaded = self.load_extension(extension_name)
+            future.set_result(loaded)
+        except BaseException:
+            future.set_result(False)
+            raise
+        finally:
+            with self._activation_lock:
+                self._activations.pop(extension_name, None)
+        return loaded
+    
+    def cors_headers(self) -> Dict[str, str]:
+        """CORS заголовки для ответов, собранных мимо Flask"""
+        if self.shared_app:
+            return {}
+        return {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+            'Access-Control-Allow-Methods': 'GET,PUT,POST,DELETE,OPTIONS'
+        }
+    
+    def unavailable_response(self, extension_name: str, environ: dict) -> Response:
+        """Ответ для маршрутов расширения, которое еще загружается или не загрузилось"""
+        state = self.states.get(extension_name, 'pending')
+        headers = {'Retry-After': '1'} if state in ('pending', 'loading', 'restarting') else {}
+        headers.update(self.cors_headers())
+        if not self.shared_app:
+            if environ.get('REQUEST_METHOD') == 'OPTIONS':
+                return Response(status=204, headers=headers)
+        
+        if 'Retry-After' in headers:
+            error = f"Extension '{extension_name}' is initializing"
+        else:
+            error = f"Extension '{extension_name}' is unavailable ({state})"
+        body = {
+            'success': False,
+            'error': error,
+            'extension': extension_name,
+            'state': state
+        }
+        status = 404 if state == 'disabled' else 503
+        return Response(json.dumps(body), status=status, mimetype='application/json', headers=headers)
+    
+    def _mount_blueprint(self, extension_name: str, bp: Blueprint):
+        """Отдельное приложение для blueprint расширения"""
+        ext_app = Flask(__name__, static_folder=None)
+        if not self.shared_app:
+            self._setup_cors(ext_app)
+        ext_app.register_blueprint(bp)
+        
+        routes = {
+            rule.endpoint: RouteStats(rule.endpoint, rule.rule, list(rule.methods))
+            for rule in ext_app.url_map.iter_rules()
+            if rule.endpoint.startswith(bp.name + '.')
+        }
+        
+        @ext_app.before_request
+        def start_timer():
+            g.extension_request_started = time.perf_counter()
+        
+        @ext_app.after_request
+        def record_request(response):
+            started = g.pop('extension_request_started', None)
+            route = routes.get(request.endpoint) if request.endpoint else None
+            if route is not None and started is not None:
+                route.record((time.perf_counter() - started) * 1000, response.status_code)
+            return response
+        
+        self.routes[extension_name] = routes
+        self.apps[extension_name] = ext_app
+        # Без api_prefix в манифесте расширение доступно по url_prefix blueprint'а
+        if extension_name not in (name for _, name in self._prefixes) and bp.url_prefix:
+            self._set_prefix(extension_name, bp.url_prefix)
+    
+    def _load_isolated(self, extension_name: str) -> bool:
+        """Запуск расширения в отдельном процессе"""
+        isolated = IsolatedExtension(self, extension_name)
+        if not isolated.start():
+            return False
+        self.extensions[extension_name] = isolated
+        self.routes[extension_name] = isolated.routes
+        self.apps[extension_name] = isolated
+        if extension_name not in (name for _, name in self._prefixes) and isolated.url_prefix:
+            self._set_prefix(extension_name, isolated.url_prefix)
+        print(f"✅ Extension '{extension_name}' loaded in isolated process")
+        return True
+    
     def load_extension(self, extension_name: str) -> bool:
         """Загрузка расширения"""
+        self.states[extension_name] = 'loading'
+        loaded = self._load_extension(extension_name)
+        if loaded:
+            self.states[extension_name] = 'ready'
+        elif self.states[extension_name] == 'loading':
+            self.states[extension_name] = 'failed'
+        return loaded
+    
+    def _load_extension(self, extension_name: str) -> bool:
         try:
             manifest = self.load_manifest(extension_name)
             if not manifest:
-                print(f"❌ No manifest found for {extension_name}")
+                print(f"❌ No valid manifest for {extension_name}: {'; '.join(self.manifests.errors(extension_name))}")
                 return False
             
             if not manifest.get('enabled', True):
                 print(f"⏭️ Extension {extension_name} is disabled")
+                self.states[extension_name] = 'disabled'
+                self._set_prefix(extension_name, None)
                 return False
             
+            if manifest.get('api_prefix'):
+                self._set_prefix(extension_name, manifest['api_prefix'])
+            
             # Проверяем зависимости
             if not self._check_dependencies(manifest):
                 print(f"⚠️ Continuing without some dependencies...")
             
+            if self.isolate or manifest.get('isolated', False):
+                return self._load_isolated(extension_name)
+            
             # Загружаем модуль расширения
-            ext_path = self.extensions_dir / extension_name
+            ext_class = import_extension_class(self.extensions_dir, extension_name)
+            if ext_class is None:
+                print(f"❌ No extension class found in {extension_name}")
+                return False
             
-            # Добавляем путь к расширению в sys.path
-            if str(ext_path.parent) not in sys.path:
-                sys.path.insert(0, str(ext_path.parent))
+            # Создаем экземпляр расширения
+            extension = ext_class()
             
-            # Импортируем модуль
-            spec = importlib.util.spec_from_file_location(
-                extension_name.replace('/', '.'),
-                ext_path / 'main.py'
-            )
+            # Инициализируем
+            if not extension.initialize():
+                print(f"❌ Failed to initialize extension '{extension_name}'")
+                return False
+            self.extensions[extension_name] = extension
             
-            if spec and spec.loader:
-                module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(module)
-                
-                # Ищем класс расширения
-                ext_class = None
-                for attr_name in dir(module):
-                    attr = getattr(module, attr_name)
-                    if (isinstance(attr, type) and 
-                        attr_name.endswith('Extension') and 
-                        attr_name != 'Extension'):
-                        ext_class = attr
-                        break
-                
-                if ext_class:
-                    # Создаем экземпляр расширения
-                    extension = ext_class()
-                    
-                    # Инициализируем
-                    if extension.initialize():
-                        self.extensions[extension_name] = extension
-                        
-                        # Регистрируем Blueprint расширения
-                        if hasattr(extension, 'get_blueprint'):
-                            bp = extension.get_blueprint()
-                            if bp:
-                                self.manager_app.register_blueprint(bp)
-                        
-                        print(f"✅ Extension '{extension_name}' loaded successfully")
-                        return True
-                    else:
-                        print(f"❌ Failed to initialize extension '{extension_name}'")
-                else:
-                    print(f"❌ No extension class found in {extension_name}")
+            # Регистрируем Blueprint расширения
+            if hasattr(extension, 'get_blueprint'):
+                bp = extension.get_blueprint()
+                if bp:
+                    self._mount_blueprint(extension_name, bp)
             
-            return False
+            print(f"✅ Extension '{extension_name}' loaded successfully")
+            return True
             
         except Exception as e:
             print(f"❌ Error loading extension {extension_name}: {e}")
@@ -195,6 +992,10 @@ class ExtensionManager:
             try:
                 self.extensions[extension_name].shutdown()
                 del self.extensions[extension_name]
+                self.apps.pop(extension_name, None)
+                self.routes.pop(extension_name, None)
+                self._set_prefix(extension_name, None)
+                self.states.pop(extension_name, None)
                 print(f"✅ Extension '{extension_name}' unloaded")
                 return True
             except Exception as e:
@@ -218,30 +1019,194 @@ class ExtensionManager:
         
         return all_ok
     
-    def start_server(self):
-        """Запуск сервера расширений"""
+    def start_server(self, production: bool = False, threads: int = 8, keep_alive: int = 120):
+        """Запуск сервера расширений
+        
+        В общем режиме (app передан в конструктор) только загружает расширения,
+        запросы обслуживает сервер приложения сцен.
+        """
         if not self.running:
             self.running = True
-            print(f"🔌 Extension API starting on port {self.extension_port}")
+            if self.shared_app:
+                print(f"🔌 Extension API mounted on the scene server (port {self.extension_port})")
+            else:
+                print(f"🔌 Extension API starting on port {self.extension_port}")
             
-            # Автозагрузка всех расширений
+            # Автозагрузка всех расширений в фоне: сервер отвечает сразу,
+            # маршруты загружающихся расширений - 503
             available = self.discover_extensions()
             print(f"📦 Available extensions: {available}")
             
+            auto_start = []
             for ext_name in available:
                 manifest = self.load_manifest(ext_name)
                 if manifest and manifest.get('auto_start', True):
-                    self.load_extension(ext_name)
-                    time.sleep(0.5)  # Небольшая задержка между загрузками
+                    auto_start.append(ext_name)
+            threading.Thread(target=self.load_extensions, args=(auto_start,), daemon=True).start()
+            
+            if self.shared_app:
+                return
             
-            # Запускаем Flask сервер
-            self.manager_app.run(
+            # Запускаем сервер
+            run_wsgi_server(
+                self.manager_app,
                 host='0.0.0.0',  # Слушаем все интерфейсы
                 port=self.extension_port,
-                debug=False,
-                use_reloader=False
+                production=production,
+                threads=threads,
+                keep_alive=keep_alive
             )
     
+    def load_extensions(self, extension_names: List[str]) -> Dict[str, bool]:
+        """Параллельная загрузка расширений с учетом зависимостей между ними
+        
+        Зависимости объявляются в манифесте: "dependencies": {"extensions": ["имя"]}.
+        Расширение загружается после всех своих зависимостей; если зависимость
+        не загрузилась или образует цикл, расширение пропускается.
+        Ленивые расширения только получают api_prefix и ждут первого запроса.
+        """
+        dependencies = {}
+        pending = set()
+        for ext_name in extension_names:
+            manifest = self.load_manifest(ext_name) or {}
+            dependencies[ext_name] = list(manifest.get('dependencies', {}).get('extensions', []))
+            if not manifest.get('enabled', True):
+                # Отключенное расширение не занимает свой api_prefix: его адреса отвечают 404
+                print(f"⏭️ Extension {ext_name} is disabled")
+                self.states[ext_name] = 'disabled'
+                self._set_prefix(ext_name, None)
+                continue
+            if manifest.get('api_prefix'):
+                self._set_prefix(ext_name, manifest['api_prefix'])
+            if manifest.get('api_prefix') and (self.lazy or manifest.get('lazy', False)):
+                self._lazy.add(ext_name)
+                self.states[ext_name] = 'lazy'
+                print(f"💤 Extension '{ext_name}' will be activated on first request to {manifest['api_prefix']}")
+            else:
+                self.states[ext_name] = 'pending'
+                pending.add(ext_name)
+        
+        running = {}
+        workers = max(1, min(self.max_load_workers, len(pending)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='extension-loader') as executor:
+            while pending or running:
+                # Запускаем всё, что готово; пропущенные могут разблокировать другие пропуски
+                progress = True
+                while progress:
+                    progress = False
+                    for ext_name in sorted(pending):
+                        states = [self.states.get(dep) for dep in dependencies[ext_name]]
+                        if any(state not in ('pending', 'lazy', 'loading', 'ready') for state in states):
+                            print(f"❌ Extension '{ext_name}' skipped: dependency unavailable "
+                                  f"({', '.join(dependencies[ext_name])})")
+                            self.states[ext_name] = 'failed'
+                        elif all(state in ('ready', 'lazy') for state in states):
+                            # Ленивые зависимости активируются вместе с расширением
+                            self.states[ext_name] = 'loading'
+                            running[executor.submit(self.activate, ext_name)] = ext_name
+                        else:
+                            continue
+                        pending.discard(ext_name)
+                        progress = True
+                
+                if not running:
+                    # Остались только расширения с циклическими зависимостями
+                    for ext_name in sorted(pending):
+                        print(f"❌ Extension '{ext_name}' skipped: circular dependency")
+                        self.states[ext_name] = 'failed'
+                    break
+                
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    running.pop(future)
+        
+        ready = sum(1 for ext_name in extension_names if self.states.get(ext_name) == 'ready')
+        print(f"📦 Extensions ready: {ready}/{len(extension_names)}, lazy: {len(self._lazy)}")
+        return {ext_name: self.states.get(ext_name) == 'ready' for ext_name in extension_names}
+    
+    def benchmark_isolation(self, extension_name: str, path: Optional[str] = None,
+                            requests: int = 1000) -> dict:
+        """Сравнение задержки вызова расширения в процессе и через IPC
+        
+        path - GET маршрут расширения, по умолчанию первый без параметров.
+        """
+        # Экземпляр в этом процессе, минуя "isolated" из манифеста
+        ext_class = import_extension_class(self.extensions_dir, extension_name)
+        extension = ext_class() if ext_class else None
+        if extension is None or not extension.initialize():
+            print(f"❌ Failed to initialize extension '{extension_name}'")
+            return {}
+        bp = extension.get_blueprint() if hasattr(extension, 'get_blueprint') else None
+        if not bp:
+            print(f"❌ Extension '{extension_name}' has no HTTP routes to benchmark")
+            extension.shutdown()
+            return {}
+        self.extensions[extension_name] = extension
+        self._mount_blueprint(extension_name, bp)
+        in_process_app = self.apps[extension_name]
+        
+        if path is None:
+            path = next((route.url for route in self.routes[extension_name].values()
+                         if 'GET' in route.methods and '<' not in route.url), None)
+        isolated = IsolatedExtension(self, extension_name)
+        if path is None or not isolated.start():
+            if path is None:
+                print(f"❌ No GET route without parameters in '{extension_name}', use --path")
+            self.unload_extension(extension_name)
+            return {}
+        
+        def measure(call):
+            for _ in range(min(50, requests)):
+                call()  # Прогрев
+            samples = []
+            for _ in range(requests):
+                started = time.perf_counter()
+                call()
+                samples.append((time.perf_counter() - started) * 1000)
+            samples.sort()
+            return {
+                'p50_ms': round(statistics.median(samples), 4),
+                'p95_ms': round(samples[max(0, int(len(samples) * 0.95) - 1)], 4),
+                'max_ms': round(samples[-1], 4)
+            }
+        
+        in_process_client = WSGIClient(in_process_app)
+        isolated_client = WSGIClient(isolated)
+        results = {
+            'path': path,
+            'requests': requests,
+            'in_process': measure(lambda: in_process_client.get(path)),
+            'isolated': measure(lambda: isolated_client.get(path)),
+            'ipc_ping': measure(isolated.ping)
+        }
+        
+        print(f"⏱️ {extension_name}: GET {path}, {requests} requests")
+        for mode in ('in_process', 'isolated', 'ipc_ping'):
+            stats = results[mode]
+            print(f"   {mode:<11} p50 {stats['p50_ms']:.4f} ms, p95 {stats['p95_ms']:.4f} ms, max {stats['max_ms']:.4f} ms")
+        
+        isolated.shutdown()
+        self.unload_extension(extension_name)
+        return results
+    
+    def prefetch_sounds(self, sounds: List[str]):
+        """Передать расширениям звуки, которые скоро понадобятся"""
+        for ext in list(self.extensions.values()):
+            if hasattr(ext, 'prefetch_sounds'):
+                try:
+                    ext.prefetch_sounds(sounds)
+                except Exception as e:
+                    print(f"⚠️ Prefetch failed: {e}")
+    
+    def notify_files_changed(self, changes: List[tuple]):
+        """Передать расширениям изменения файлов проекта [(тип, путь)]"""
+        for ext in list(self.extensions.values()):
+            if hasattr(ext, 'on_files_changed'):
+                try:
+                    ext.on_files_changed(changes)
+                except Exception as e:
+                    print(f"⚠️ File change handler failed: {e}")
+    
     def stop_all(self):
         """Остановка всех расширений"""
         for name in list(self.extensions.keys()):
@@ -5,14 +5,24 @@ Void Audio Extension - Аудио расширение с микшировани
 import sounddevice as sd
 import soundfile as sf
 import numpy as np
+import hashlib
+import heapq
+import itertools
 import json
+import math
+import os
 import threading
 import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional, Any, Set, Tuple
+from dataclasses import dataclass, asdict, field, replace
 from flask import Blueprint, jsonify, request
 
+SUPPORTED_FORMATS = {'.mp3', '.wav', '.ogg', '.flac', '.m4a'}
+
 @dataclass
 class AudioFile:
     """Информация об аудио файле"""
@@ -23,9 +33,17 @@ class AudioFile:
     loaded: bool = False
     duration: float = 0.0
 
+@dataclass
+class GainRamp:
+    """Линейное изменение громкости канала"""
+    target: float
+    step: float  # Изменение громкости за кадр
+    remaining: int  # Осталось кадров до цели
+    stop_after: bool = False  # Остановить канал по завершении (fade out)
+
 @dataclass
 class ActiveChannel:
-    """Активный канал воспроизведения"""
+    """Активный канал воспроизведения (голос микшера)"""
     id: int
     sound_name: str
     volume: float
@@ -33,24 +51,621 @@ class ActiveChannel:
     playing: bool
     paused: bool
     start_time: float
-    stream: Any = None
+    data: Any = None  # PCM буфер звука (frames, 2)
+    position: int = 0  # Текущая позиция воспроизведения в кадрах
+    source: Any = None  # StreamingSource для потоковых звуков
+    gain: float = 1.0  # Текущая громкость с учетом фейдов
+    ramp: Optional[GainRamp] = None  # Активный фейд
+    ended: bool = False  # Канал доигран или затих, ждет удаления из таблицы
+    file_path: str = ''  # Файл звука - ключ в кэше
+
+@dataclass
+class PreloadJob:
+    """Фоновая задача предзагрузки звуков"""
+    id: str
+    sounds: List[str]  # В порядке загрузки (приоритетные первыми)
+    total_bytes: int
+    started: float
+    files_done: int = 0
+    files_failed: int = 0
+    bytes_done: int = 0
+    state: str = 'running'  # running, done, cancelled
+    finished: Optional[float] = None
+    _lock: Any = field(default_factory=threading.Lock, repr=False)
+    
+    @property
+    def cancelled(self) -> bool:
+        return self.state == 'cancelled'
+    
+    def record(self, size: int, success: bool):
+        """Учет обработанного файла"""
+        with self._lock:
+            if success:
+                self.files_done += 1
+            else:
+                self.files_failed += 1
+            self.bytes_done += size
+            if self.state == 'running' and self.files_done + self.files_failed >= len(self.sounds):
+                self.state = 'done'
+                self.finished = time.time()
+    
+    def cancel(self):
+        """Отмена: ожидающие файлы не загружаются"""
+        with self._lock:
+            if self.state != 'running':
+                return
+            self.state = 'cancelled'
+            self.finished = time.time()
+    
+    def progress(self) -> dict:
+        """Прогресс задачи с оценкой оставшегося времени"""
+        elapsed = (self.finished or time.time()) - self.started
+        eta = None
+        if self.state == 'running' and self.bytes_done > 0:
+            eta = elapsed / self.bytes_done * (self.total_bytes - self.bytes_done)
+        return {
+            'job_id': self.id,
+            'state': self.state,
+            'files_total': len(self.sounds),
+            'files_done': self.files_done,
+            'files_failed': self.files_failed,
+            'bytes_total': self.total_bytes,
+            'bytes_done': self.bytes_done,
+            'percent': round(100.0 * self.bytes_done / self.total_bytes, 1) if self.total_bytes else 100.0,
+            'elapsed': elapsed,
+            'eta': eta
+        }
+
+def resample_linear(data: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+    """Векторизованный линейный ресемплинг всего буфера (frames, channels)"""
+    if src_rate == dst_rate or len(data) == 0:
+        return data
+    
+    out_frames = max(1, int(round(len(data) * dst_rate / src_rate)))
+    positions = np.arange(out_frames, dtype=np.float64) * (src_rate / dst_rate)
+    np.minimum(positions, len(data) - 1, out=positions)
+    source_positions = np.arange(len(data), dtype=np.float64)
+    
+    out = np.empty((out_frames, data.shape[1]), dtype=np.float32)
+    for ch in range(data.shape[1]):
+        out[:, ch] = np.interp(positions, source_positions, data[:, ch])
+    return out
+
+class LinearResampler:
+    """Потоковый линейный ресемплер: сохраняет состояние между блоками"""
+    
+    def __init__(self, src_rate: int, dst_rate: int):
+        self.step = src_rate / dst_rate  # Входных кадров на один выходной
+        self._pos = 0.0  # Позиция следующего выходного кадра во входном блоке
+        self._tail: Optional[np.ndarray] = None  # Последний кадр прошлого блока
+    
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Ресемплинг очередного блока"""
+        if self._tail is not None:
+            block = np.concatenate((self._tail, block))
+        
+        last = len(block) - 1
+        count = int(np.ceil((last - self._pos) / self.step)) if last > self._pos else 0
+        positions = self._pos + np.arange(count, dtype=np.float64) * self.step
+        index = np.minimum(positions.astype(np.int64), max(last - 1, 0))
+        frac = (positions - index).astype(np.float32)[:, None]
+        
+        out = block[index] * (1.0 - frac)
+        out += block[index + 1] * frac
+        
+        self._tail = block[-1:]
+        self._pos = self._pos + count * self.step - last
+        return out
+
+class RingBuffer:
+    """Кольцевой буфер PCM кадров
+    
+    Один писатель (фоновый декодер) и один читатель (callback потока).
+    Счётчики кадров только растут, поэтому блокировки не нужны.
+    """
+    
+    def __init__(self, capacity: int, channels: int = 2):
+        self.capacity = capacity
+        self._buffer = np.zeros((capacity, channels), dtype=np.float32)
+        self._read = 0
+        self._write = 0
+        self._space = threading.Event()
+    
+    @property
+    def available(self) -> int:
+        """Количество кадров, готовых к чтению"""
+        return self._write - self._read
+    
+    def write(self, block: np.ndarray, stop_event: threading.Event) -> bool:
+        """Запись блока, ждёт свободного места; False если запись прервана"""
+        offset = 0
+        while offset < len(block):
+            free = self.capacity - self.available
+            if free == 0:
+                self._space.clear()
+                if self.capacity - self.available == 0:
+                    self._space.wait(0.1)
+                if stop_event.is_set():
+                    return False
+                continue
+            
+            count = min(free, len(block) - offset)
+            start = self._write % self.capacity
+            first = min(count, self.capacity - start)
+            self._buffer[start:start + first] = block[offset:offset + first]
+            if count > first:
+                self._buffer[:count - first] = block[offset + first:offset + count]
+            
+            # Публикуем кадры только после копирования
+            self._write += count
+            offset += count
+        return True
+    
+    def read_into(self, out: np.ndarray) -> int:
+        """Чтение до len(out) кадров без ожидания, возвращает число прочитанных"""
+        count = min(len(out), self.available)
+        start = self._read % self.capacity
+        first = min(count, self.capacity - start)
+        out[:first] = self._buffer[start:start + first]
+        if count > first:
+            out[first:count] = self._buffer[:count - first]
+        self._read += count
+        self._space.set()
+        return count
+    
+    def wake(self):
+        """Разбудить ожидающего писателя"""
+        self._space.set()
+
+class StreamingSource:
+    """Потоковый источник: фоновый поток декодирует файл блоками в кольцевой буфер"""
+    
+    def __init__(self, file_path: Path, loops: int, buffer_frames: int,
+                 sample_rate: int, block_frames: int = 4096):
+        self.file_path = Path(file_path)
+        self.sample_rate = sample_rate
+        self.loops = loops
+        self.block_frames = block_frames
+        self.ring = RingBuffer(buffer_frames)
+        self.finished = False  # Декодер дочитал файл (с учетом повторов)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+    
+    def start(self):
+        """Запуск фонового декодера"""
+        self._thread.start()
+    
+    def _run(self):
+        """Цикл декодирования"""
+        try:
+            with sf.SoundFile(str(self.file_path)) as f:
+                resampler = None
+                if f.samplerate != self.sample_rate:
+                    resampler = LinearResampler(f.samplerate, self.sample_rate)
+                
+                while not self._stop.is_set():
+                    block = f.read(self.block_frames, dtype='float32', always_2d=True)
+                    if len(block) == 0:
+                        if self.loops > 0:
+                            self.loops -= 1
+                            f.seek(0)
+                            continue
+                        break
+                    
+                    # Приводим к стерео
+                    if block.shape[1] == 1:
+                        block = np.repeat(block, 2, axis=1)
+                    elif block.shape[1] > 2:
+                        block = block[:, :2]
+                    
+                    if resampler is not None:
+                        block = resampler.process(block)
+                    
+                    if not self.ring.write(block, self._stop):
+                        break
+        except Exception as e:
+            print(f"❌ Streaming error {self.file_path.name}: {e}")
+        finally:
+            self.finished = True
+    
+    def read_into(self, out: np.ndarray) -> int:
+        """Чтение готовых кадров (вызывается из callback)"""
+        return self.ring.read_into(out)
+    
+    @property
+    def exhausted(self) -> bool:
+        """Файл дочитан и буфер опустошен"""
+        return self.finished and self.ring.available == 0
+    
+    def close(self):
+        """Остановка декодера"""
+        self._stop.set()
+        self.ring.wake()
+
+class SoundNameIndex:
+    """Индекс имён звуков
+    
+    Точный поиск и поиск без учета регистра - за O(1), поиск по подстроке -
+    через пересечение множеств n-грамм (длиной до 3) вместо полного перебора.
+    """
+    
+    NGRAM = 3
+    
+    def __init__(self):
+        self.names: Dict[str, Path] = {}
+        self._lower: Dict[str, Set[str]] = {}  # lower(name) -> имена
+        self._ngrams: Dict[str, Set[str]] = {}  # n-грамма -> имена
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self.names)
+    
+    @classmethod
+    def _ngrams_of(cls, text: str) -> Set[str]:
+        """Все подстроки длиной от 1 до NGRAM"""
+        return {text[i:i + n] for n in range(1, min(cls.NGRAM, len(text)) + 1)
+                for i in range(len(text) - n + 1)}
+    
+    def add(self, name: str, path: Path):
+        """Добавить имя в индекс"""
+        with self._lock:
+            if name in self.names:
+                self.names[name] = path
+                return
+            self.names[name] = path
+            lower = name.lower()
+            self._lower.setdefault(lower, set()).add(name)
+            for gram in self._ngrams_of(lower):
+                self._ngrams.setdefault(gram, set()).add(name)
+    
+    def remove(self, name: str):
+        """Удалить имя из индекса"""
+        with self._lock:
+            if self.names.pop(name, None) is None:
+                return
+            lower = name.lower()
+            self._discard(self._lower, lower, name)
+            for gram in self._ngrams_of(lower):
+                self._discard(self._ngrams, gram, name)
+    
+    @staticmethod
+    def _discard(index: Dict[str, Set[str]], key: str, name: str):
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.discard(name)
+            if not bucket:
+                del index[key]
+    
+    def get(self, name: str) -> Optional[Path]:
+        """Точный поиск, затем поиск без учета регистра"""
+        path = self.names.get(name)
+        if path is not None:
+            return path
+        with self._lock:
+            bucket = self._lower.get(name.lower())
+            if bucket:
+                return self.names.get(min(bucket))
+        return None
+    
+    def search(self, query: str, limit: int = 20) -> List[str]:
+        """Ранжированный поиск по подстроке
+        
+        Порядок: точное совпадение, префикс, начало слова, прочие вхождения;
+        внутри группы - более ранняя позиция и более короткое имя.
+        """
+        query = query.lower()
+        if not query or limit <= 0:
+            return []
+        
+        if len(query) <= self.NGRAM:
+            grams = [query]
+        else:
+            grams = [query[i:i + self.NGRAM] for i in range(len(query) - self.NGRAM + 1)]
+        
+        matches = []
+        with self._lock:
+            buckets = [self._ngrams.get(gram) for gram in grams]
+            if not all(buckets):
+                return []
+            buckets.sort(key=len)
+            candidates = set(buckets[0])
+            for bucket in buckets[1:]:
+                candidates &= bucket
+                if not candidates:
+                    return []
+        
+        for name in candidates:
+            lower = name.lower()
+            pos = lower.find(query)
+            if pos < 0:
+                continue
+            if lower == query:
+                rank = 0
+            elif pos == 0:
+                rank = 1
+            elif lower[pos - 1] in '/\\_- .':
+                rank = 2
+            else:
+                rank = 3
+            matches.append((rank, pos, len(name), name))
+        
+        return [match[3] for match in heapq.nsmallest(limit, matches)]
+
+class SoundCache:
+    """Кэш декодированных звуков с ограничением по памяти
+    
+    Ключ - путь к файлу, имена из запросов (click, sfx/Click...) -
+    псевдонимы ключа, так что один файл декодируется и хранится один раз.
+    Вытесняются давно не использованные звуки (LRU), кроме тех,
+    что сейчас играют.
+    """
+    
+    def __init__(self, max_bytes: int, in_use: Callable[[], Set[str]]):
+        self.max_bytes = max_bytes
+        self._in_use = in_use
+        self._items: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._aliases: Dict[str, str] = {}  # {имя: путь к файлу}
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def _key(self, name: str) -> str:
+        return name if name in self._items else self._aliases.get(name, name)
+    
+    def __contains__(self, name: str) -> bool:
+        return self._key(name) in self._items
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def __getitem__(self, name: str) -> Dict[str, Any]:
+        return self._items[self._key(name)]
+    
+    def peek(self, name: str) -> Optional[Dict[str, Any]]:
+        """Получить звук без учета в статистике и LRU"""
+        return self._items.get(self._key(name))
+    
+    def alias(self, name: str, key: str):
+        """Запомнить, что имя указывает на файл key"""
+        if name != key:
+            self._aliases[name] = key
+    
+    def clear_aliases(self):
+        """Сброс псевдонимов: после изменения индекса имя может указывать на другой файл"""
+        self._aliases = {}
+    
+    @staticmethod
+    def _size_of(sound_data: Dict[str, Any]) -> int:
+        data = sound_data.get('data')
+        # Страницы memmap принадлежат кэшу ОС и в бюджет не входят
+        if data is None or isinstance(data, np.memmap):
+            return 0
+        return data.nbytes
+    
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """Получить звук с учетом статистики и порядка LRU"""
+        with self._lock:
+            key = self._key(name)
+            sound_data = self._items.get(key)
+            if sound_data is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return sound_data
+    
+    def put(self, key: str, sound_data: Dict[str, Any], alias: Optional[str] = None):
+        """Добавить звук и вытеснить лишнее"""
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.current_bytes -= self._size_of(old)
+            self._items[key] = sound_data
+            self.current_bytes += self._size_of(sound_data)
+            if alias is not None:
+                self.alias(alias, key)
+            self._evict(keep=key)
+    
+    def _drop(self, key: str) -> Dict[str, Any]:
+        """Удаление записи вместе с ее псевдонимами (вызывается под блокировкой)"""
+        sound_data = self._items.pop(key)
+        self.current_bytes -= self._size_of(sound_data)
+        self._aliases = {name: target for name, target in self._aliases.items() if target != key}
+        return sound_data
+    
+    def remove(self, key: str) -> bool:
+        """Удалить звук из кэша"""
+        with self._lock:
+            if key not in self._items:
+                return False
+            self._drop(key)
+            return True
+    
+    def _evict(self, keep: str):
+        """Вытеснение до укладывания в бюджет (вызывается под блокировкой)"""
+        if self.current_bytes <= self.max_bytes:
+            return
+        
+        in_use = self._in_use()
+        for name in list(self._items.keys()):
+            if self.current_bytes <= self.max_bytes:
+                break
+            if name == keep or name in in_use:
+                continue
+            self._drop(name)
+            self.evictions += 1
+            print(f"♻️ Evicted sound from cache: {name}")
+    
+    def stats(self) -> dict:
+        """Статистика кэша"""
+        return {
+            'entries': len(self._items),
+            'aliases': len(self._aliases),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+class PcmDiskCache:
+    """Дисковый кэш декодированного PCM
+    
+    Хранит float32 стерео в .npy с ключом по пути, mtime и размеру исходника
+    и частоте микшера. Загрузка через memmap: без декодирования, страницы
+    разделяются ОС.
+    """
+    
+    def __init__(self, cache_dir: Path, sample_rate: int):
+        self.cache_dir = Path(cache_dir)
+        self.sample_rate = sample_rate
+    
+    def _key(self, file_path: Path, stat: os.stat_result) -> str:
+        raw = f"{Path(file_path).resolve()}|{stat.st_mtime_ns}|{stat.st_size}|{self.sample_rate}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    
+    def _paths(self, file_path: Path) -> Tuple[Path, Path]:
+        key = self._key(file_path, Path(file_path).stat())
+        return self.cache_dir / f"{key}.npy", self.cache_dir / f"{key}.json"
+    
+    def contains(self, file_path: Path) -> bool:
+        """Есть ли актуальная запись для файла"""
+        npy_path, _ = self._paths(file_path)
+        return npy_path.exists()
+    
+    def load(self, file_path: Path) -> Optional[Tuple[np.ndarray, int]]:
+        """Отобразить PCM файла в память, None если записи нет"""
+        try:
+            npy_path, meta_path = self._paths(file_path)
+            if not npy_path.exists():
+                return None
+            meta = json.loads(meta_path.read_text(encoding='utf-8'))
+            data = np.load(str(npy_path), mmap_mode='r')
+            return data, meta['sample_rate']
+        except Exception as e:
+            print(f"⚠️ PCM cache entry unreadable for {Path(file_path).name}: {e}")
+            return None
+    
+    def store(self, file_path: Path, data: np.ndarray, sample_rate: int):
+        """Сохранить декодированный PCM (атомарно через временный файл)"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            npy_path, meta_path = self._paths(file_path)
+            meta_path.write_text(json.dumps({
+                'source': str(Path(file_path).resolve()),
+                'sample_rate': sample_rate,
+                'frames': len(data)
+            }), encoding='utf-8')
+            
+            tmp_path = npy_path.with_suffix('.tmp')
+            with open(tmp_path, 'wb') as f:
+                np.save(f, np.ascontiguousarray(data, dtype=np.float32))
+            os.replace(tmp_path, npy_path)
+        except Exception as e:
+            print(f"⚠️ Failed to write PCM cache for {Path(file_path).name}: {e}")
+    
+    def prune(self) -> int:
+        """Удалить записи, исходники которых изменились или удалены"""
+        removed = 0
+        if not self.cache_dir.exists():
+            return removed
+        
+        for meta_path in self.cache_dir.glob('*.json'):
+            npy_path = meta_path.with_suffix('.npy')
+            try:
+                source = Path(json.loads(meta_path.read_text(encoding='utf-8'))['source'])
+                if source.exists() and self._paths(source)[0] == npy_path:
+                    continue
+            except Exception:
+                pass
+            
+            for path in (npy_path, meta_path):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+            removed += 1
+        return removed
 
 class AudioMixer:
-    """Микшер аудио с использованием sounddevice"""
+    """Микшер аудио с использованием sounddevice
     
-    def __init__(self, audio_dir: Path):
+    Все каналы микшируются программно в одном постоянном выходном потоке,
+    канал - это лёгкая запись с позицией в PCM буфере звука.
+    """
+    
+    def __init__(self, audio_dir: Path, stream_threshold_seconds: float = 30.0,
+                 stream_threshold_mb: float = 16.0, cache_limit_mb: float = 256.0,
+                 pcm_cache_dir: Optional[Path] = None):
         self.audio_dir = Path(audio_dir)
         self.audio_dir.mkdir(parents=True, exist_ok=True)
         
-        self.sounds: Dict[str, Dict[str, Any]] = {}  # {name: {data, sample_rate}}
+        # {name: {data, sample_rate}}, ограничен по памяти
+        self.sounds = SoundCache(int(cache_limit_mb * 1024 * 1024), self._sounds_in_use)
         self.channels: Dict[int, ActiveChannel] = {}
         self.global_volume = 1.0
         self.muted = False
         self.max_channels = 32
         self.channel_counter = 0
-        self._lock = threading.Lock()
+        
+        # Таблица каналов копируется при записи: callback читает ссылку без блокировок,
+        # изменения - короткие критические секции под _voice_lock
+        self._voice_lock = threading.Lock()
+        # Завершенные каналы: callback только ставит их в очередь,
+        # удаление и остановка декодеров - в отдельном потоке
+        self._finished: deque = deque()
+        self._finished_event = threading.Event()
+        self._reaper: Optional[threading.Thread] = None
+        # Загрузки в процессе: параллельные запросы одного звука ждут одно декодирование
+        self._load_lock = threading.Lock()
+        self._loading: Dict[str, Future] = {}
+        
+        # Фоновая предзагрузка: libsndfile отпускает GIL, потоков достаточно.
+        # Очередь общая для всех задач: приоритетные звуки любой задачи
+        # (следующая сцена) декодируются раньше остального бэклога
+        self.preload_workers = min(8, (os.cpu_count() or 2) * 2)
+        self._preload_queue: List[tuple] = []  # Куча (приоритет, порядок, задача, звук, размер)
+        self._preload_cond = threading.Condition()
+        self._preload_order = itertools.count()
+        self._preload_threads: List[threading.Thread] = []
+        self._preload_stopping = False
+        self._preload_jobs: "OrderedDict[str, PreloadJob]" = OrderedDict()
+        self._jobs_lock = threading.Lock()  # Таблица задач меняется из потоков запросов
+        self.max_preload_jobs = 16
         self.initialized = False
-        self._file_index: Dict[str, Path] = {}  # Индекс файлов по имени
+        self._name_index = SoundNameIndex()
+        self._file_index: Dict[str, Path] = self._name_index.names  # Индекс файлов по имени
+        self._index_lock = threading.RLock()  # Полная переиндексация и события наблюдателя
+        self._keys_by_file: Dict[Path, List[str]] = {}  # Имена, под которыми проиндексирован файл
+        
+        # Каталог файлов строится при индексации, опрос статуса не ходит на диск
+        self._catalog: Dict[Path, AudioFile] = {}
+        self._file_signatures: Dict[Path, Tuple[int, int]] = {}  # (mtime_ns, size)
+        self._catalog_sorted: Optional[List[AudioFile]] = None
+        
+        # Параметры единственного выходного потока
+        self.sample_rate = 44100
+        self.blocksize = 1024
+        self.stream: Optional[sd.OutputStream] = None
+        self._stream_lock = threading.Lock()
+        self._scratch_buffer = np.zeros((self.blocksize, 2), dtype=np.float32)
+        
+        # Буферы огибающих громкости (фейды считаются поблочно в callback)
+        self._ramp_index = np.arange(1, self.blocksize + 1, dtype=np.float32)
+        self._envelope = np.zeros(self.blocksize, dtype=np.float32)
+        self._master_envelope = np.zeros(self.blocksize, dtype=np.float32)
+        self._master_gain = 1.0
+        self.min_ramp_ms = 10  # Сглаживание мгновенных изменений громкости
+        
+        # Длинные звуки (музыка) не декодируются целиком, а читаются потоком
+        self.stream_threshold_seconds = stream_threshold_seconds
+        self.stream_threshold_bytes = int(stream_threshold_mb * 1024 * 1024)
+        self.stream_buffer_seconds = 2.0
+        
+        # Дисковый кэш PCM, чтобы не декодировать сжатые файлы при каждом запуске
+        self.disk_cache = PcmDiskCache(pcm_cache_dir, self.sample_rate) if pcm_cache_dir else None
         
     def initialize(self):
         """Инициализация аудио системы"""
@@ -66,6 +681,10 @@ class AudioMixer:
             # Индексируем все аудио файлы
             self._index_audio_files()
             
+            # Открываем общий выходной поток микшера
+            self._open_stream()
+            self._start_reaper()
+            
             self.initialized = True
             print(f"🔊 Audio mixer initialized with {self.max_channels} channels")
             print(f"📁 Indexed {len(self._file_index)} audio files")
@@ -75,280 +694,765 @@ class AudioMixer:
             return False
     
     def _index_audio_files(self):
-        """Индексация всех аудио файлов в директории"""
-        self._file_index.clear()
-        supported_formats = {'.mp3', '.wav', '.ogg', '.flac', '.m4a'}
-        
-        if self.audio_dir.exists():
-            for file_path in self.audio_dir.rglob('*'):
-                if file_path.suffix.lower() in supported_formats:
-                    # Индексируем по имени файла без расширения
-                    name = file_path.stem
-                    # Также индексируем по относительному пути без расширения
-                    relative_path = file_path.relative_to(self.audio_dir)
-                    path_name = str(relative_path.with_suffix(''))
-                    
-                    self._file_index[name] = file_path
-                    self._file_index[path_name] = file_path
-                    
-                    print(f"📁 Indexed: {name} -> {relative_path}")
+        """Индексация аудио файлов: добавляются новые, удалённые убираются,
+        изменённые обновляются в каталоге и выгружаются из кэша"""
+        with self._index_lock:
+            current: Dict[Path, os.stat_result] = {}
+            if self.audio_dir.exists():
+                for file_path in self.audio_dir.rglob('*'):
+                    if file_path.suffix.lower() in SUPPORTED_FORMATS:
+                        try:
+                            current[file_path] = file_path.stat()
+                        except OSError:
+                            continue
+            
+            for file_path in set(self._keys_by_file) - set(current):
+                self._unindex_file(file_path)
+            for file_path in sorted(current):
+                stat = current[file_path]
+                if file_path not in self._keys_by_file:
+                    self._index_file(file_path, stat)
+                elif self._file_signatures.get(file_path) != (stat.st_mtime_ns, stat.st_size):
+                    self._update_file(file_path, stat)
+    
+    def _catalog_entry(self, file_path: Path, stat: os.stat_result):
+        """Запись каталога для файла"""
+        self._catalog[file_path] = AudioFile(
+            name=file_path.stem,
+            filename=file_path.name,
+            path=str(file_path.relative_to(self.audio_dir)),
+            size=stat.st_size
+        )
+        self._file_signatures[file_path] = (stat.st_mtime_ns, stat.st_size)
+        self._catalog_sorted = None
+    
+    def _update_file(self, file_path: Path, stat: os.stat_result):
+        """Файл изменился: обновляем каталог и выгружаем устаревший PCM"""
+        self._catalog_entry(file_path, stat)
+        self.sounds.remove(str(file_path))
+    
+    def _index_file(self, file_path: Path, stat: os.stat_result):
+        """Добавление файла в индекс имён и каталог"""
+        # Индексируем по имени файла без расширения
+        name = file_path.stem
+        # Также индексируем по относительному пути без расширения
+        relative_path = file_path.relative_to(self.audio_dir)
+        path_name = str(relative_path.with_suffix(''))
+        
+        keys = [name] if path_name == name else [name, path_name]
+        for key in keys:
+            self._name_index.add(key, file_path)
+        self._keys_by_file[file_path] = keys
+        self._catalog_entry(file_path, stat)
+        # Имя могло разрешаться в другой файл по частичному совпадению
+        self.sounds.clear_aliases()
+        
+        print(f"📁 Indexed: {name} -> {relative_path}")
+    
+    def _unindex_file(self, file_path: Path):
+        """Удаление файла из индекса имён и каталога"""
+        self._catalog.pop(file_path, None)
+        self._file_signatures.pop(file_path, None)
+        self._catalog_sorted = None
+        self.sounds.remove(str(file_path))
+        self.sounds.clear_aliases()
+        
+        for key in self._keys_by_file.pop(file_path, []):
+            if self._file_index.get(key) != file_path:
+                continue
+            self._name_index.remove(key)
+            # Имя могло принадлежать и другому файлу (одинаковые имена в разных папках)
+            for other_path, other_keys in self._keys_by_file.items():
+                if key in other_keys:
+                    self._name_index.add(key, other_path)
+                    break
+    
+    def apply_file_changes(self, changes: List[Tuple[str, str]]) -> int:
+        """Инкрементальное обновление индекса по событиям наблюдателя файлов
+        
+        changes - [(тип, путь)], тип - 'created', 'modified' или 'deleted'.
+        """
+        audio_root = Path(os.path.abspath(self.audio_dir))
+        applied = 0
+        with self._index_lock:
+            for kind, path in changes:
+                path = Path(path)
+                if path.suffix.lower() not in SUPPORTED_FORMATS:
+                    continue
+                try:
+                    file_path = self.audio_dir / Path(os.path.abspath(path)).relative_to(audio_root)
+                except ValueError:
+                    continue
+                
+                if kind == 'deleted':
+                    if file_path in self._keys_by_file:
+                        self._unindex_file(file_path)
+                        applied += 1
+                    continue
+                try:
+                    stat = file_path.stat()
+                except OSError:
+                    continue
+                if file_path not in self._keys_by_file:
+                    self._index_file(file_path, stat)
+                elif self._file_signatures.get(file_path) != (stat.st_mtime_ns, stat.st_size):
+                    self._update_file(file_path, stat)
+                applied += 1
+        return applied
     
     def refresh_index(self):
         """Обновление индекса файлов"""
         self._index_audio_files()
         return len(self._file_index)
     
+    def _open_stream(self):
+        """Открытие единственного выходного потока микшера"""
+        with self._stream_lock:
+            if self.stream is not None:
+                return
+            
+            stream = sd.OutputStream(
+                samplerate=self.sample_rate,
+                channels=2,
+                dtype='float32',
+                callback=self._audio_callback,
+                blocksize=self.blocksize,
+                latency='low'
+            )
+            stream.start()
+            self.stream = stream
+        print(f"🎚️ Output stream opened ({self.sample_rate} Hz, block {self.blocksize})")
+    
+    def _close_stream(self):
+        """Закрытие выходного потока"""
+        with self._stream_lock:
+            if self.stream is not None:
+                try:
+                    self.stream.stop()
+                    self.stream.close()
+                except Exception:
+                    pass
+                self.stream = None
+    
+    def _audio_callback(self, outdata, frames, time_info, status):
+        """Callback выходного потока: суммирует все активные каналы в один буфер"""
+        if status:
+            print(f"Audio status: {status}")
+        
+        if frames > len(self._scratch_buffer):
+            self._scratch_buffer = np.zeros((frames, 2), dtype=np.float32)
+            self._ramp_index = np.arange(1, frames + 1, dtype=np.float32)
+            self._envelope = np.zeros(frames, dtype=np.float32)
+            self._master_envelope = np.zeros(frames, dtype=np.float32)
+        
+        # Микшируем прямо в outdata, без промежуточных массивов
+        outdata.fill(0)
+        
+        # Таблица не изменяется после публикации, блокировка не нужна
+        for channel in self.channels.values():
+            if channel.playing and not channel.paused:
+                try:
+                    self._mix_channel(channel, outdata, frames)
+                except Exception as e:
+                    # Сломанный канал снимается, остальные продолжают звучать
+                    print(f"❌ Channel [{channel.id}] {channel.sound_name} failed: {e}")
+                    self._finish_channel(channel)
+        
+        # Общая громкость плавно меняется в пределах одного блока
+        master = 0.0 if self.muted else self.global_volume
+        if master != self._master_gain:
+            envelope = self._master_envelope[:frames]
+            np.multiply(self._ramp_index[:frames], (master - self._master_gain) / frames, out=envelope)
+            envelope += self._master_gain
+            outdata *= envelope[:, None]
+            self._master_gain = master
+        elif master != 1.0:
+            outdata *= master
+        np.clip(outdata, -1.0, 1.0, out=outdata)
+    
+    def _channel_gain(self, channel: ActiveChannel, frames: int):
+        """Громкость канала на блок: число или огибающая (frames, 1) при фейде"""
+        ramp = channel.ramp
+        if ramp is None:
+            return channel.gain
+        
+        count = min(ramp.remaining, frames)
+        envelope = self._envelope[:frames]
+        np.multiply(self._ramp_index[:count], ramp.step, out=envelope[:count])
+        envelope[:count] += channel.gain
+        envelope[count:] = ramp.target
+        
+        ramp.remaining -= count
+        if ramp.remaining <= 0:
+            channel.gain = ramp.target
+            # Фейд мог быть заменён новым из другого потока
+            if channel.ramp is ramp:
+                channel.ramp = None
+            if ramp.stop_after:
+                self._finish_channel(channel)
+        else:
+            channel.gain += ramp.step * count
+        return envelope[:, None]
+    
+    def _mix_channel(self, channel: ActiveChannel, mix: np.ndarray, frames: int):
+        """Добавление очередного блока канала в буфер микширования"""
+        gain = self._channel_gain(channel, frames)
+        
+        if channel.source is not None:
+            # Потоковый звук: повторы обрабатывает декодер
+            chunk = self._scratch_buffer[:frames]
+            count = channel.source.read_into(chunk)
+            if count:
+                chunk = chunk[:count]
+                chunk *= gain if np.isscalar(gain) else gain[:count]
+                mix[:count] += chunk
+                channel.position += count
+            if count < frames and channel.source.exhausted:
+                self._finish_channel(channel)
+            return
+        
+        data = channel.data
+        total = len(data)
+        filled = 0
+        
+        while filled < frames:
+            remaining = total - channel.position
+            if remaining <= 0:
+                if channel.loops > 0 and total > 0:
+                    channel.loops -= 1
+                    channel.position = 0
+                    continue
+                # Звук доигран, канал удалит поток очистки
+                self._finish_channel(channel)
+                return
+            
+            count = min(frames - filled, remaining)
+            start = channel.position
+            # Громкость применяется во временный буфер, общий PCM не меняется
+            chunk = self._scratch_buffer[:count]
+            segment_gain = gain if np.isscalar(gain) else gain[filled:filled + count]
+            np.multiply(data[start:start + count], segment_gain, out=chunk)
+            mix[filled:filled + count] += chunk
+            channel.position += count
+            filled += count
+    
     def shutdown(self):
         """Завершение работы"""
+        for job in self._list_preload_jobs():
+            job.cancel()
+        with self._preload_cond:
+            self._preload_stopping = True
+            self._preload_queue.clear()
+            self._preload_cond.notify_all()
         self.stop_all()
+        self._close_stream()
         self.initialized = False
+        self._finished_event.set()  # Поток очистки завершится сам
         print("Audio system shutdown")
     
     def find_sound_file(self, sound_name: str) -> Optional[Path]:
         """Поиск аудио файла по имени"""
-        # Прямой поиск в индексе
-        if sound_name in self._file_index:
-            return self._file_index[sound_name]
+        # Прямой поиск и поиск без учета регистра
+        path = self._name_index.get(sound_name)
+        if path is not None:
+            return path
         
-        # Поиск без учета регистра
-        sound_name_lower = sound_name.lower()
-        for name, path in self._file_index.items():
-            if name.lower() == sound_name_lower:
-                return path
-        
-        # Частичное совпадение
-        for name, path in self._file_index.items():
-            if sound_name_lower in name.lower():
-                return path
+        # Лучшее частичное совпадение
+        best = self._name_index.search(sound_name, limit=1)
+        if best:
+            return self._file_index.get(best[0])
         
         return None
     
+    def search_sounds(self, query: str, limit: int = 20) -> List[dict]:
+        """Ранжированный поиск звуков по имени"""
+        results = []
+        for name in self._name_index.search(query, limit):
+            path = self._file_index.get(name)
+            if path is None:
+                continue
+            results.append({
+                'name': name,
+                'path': str(path.relative_to(self.audio_dir)),
+                'loaded': str(path) in self.sounds
+            })
+        return results
+    
+    def _sounds_in_use(self) -> Set[str]:
+        """Файлы звуков, которые сейчас играют или стоят на паузе"""
+        return {channel.file_path for channel in list(self.channels.values()) if not channel.ended}
+    
     def load_sound(self, sound_name: str) -> bool:
         """Загрузка звука в память"""
-        with self._lock:
-            if sound_name in self.sounds:
-                return True
+        return self._get_sound(sound_name) is not None
+    
+    def _get_sound(self, sound_name: str) -> Optional[Dict[str, Any]]:
+        """Получить звук из кэша, загрузив его при промахе
+        
+        Загрузки и кэш идут по пути файла: разные имена одного файла
+        (Click, click, sfx/Click) декодируют его один раз. Декодирование
+        идёт вне блокировок; если файл уже грузится другим запросом,
+        ждём его результат.
+        """
+        sound_data = self.sounds.get(sound_name)
+        if sound_data is not None:
+            return sound_data
+        
+        file_path = self.find_sound_file(sound_name)
+        if not file_path:
+            print(f"❌ Sound file not found: {sound_name}")
+            return None
+        key = str(file_path)
+        
+        with self._load_lock:
+            future = self._loading.get(key)
+            owner = future is None
+            if owner:
+                # Файл мог загрузиться под другим именем или пока мы ждали блокировку
+                sound_data = self.sounds.peek(key)
+                if sound_data is not None:
+                    self.sounds.alias(sound_name, key)
+                    return sound_data
+                future = Future()
+                self._loading[key] = future
+        
+        if not owner:
+            sound_data = future.result()
+            if sound_data is not None:
+                self.sounds.alias(sound_name, key)
+            return sound_data
+        
+        sound_data = None
+        try:
+            sound_data = self._load_sound_data(file_path, sound_name)
+            return sound_data
+        finally:
+            with self._load_lock:
+                self._loading.pop(key, None)
+            future.set_result(sound_data)
+    
+    def _load_sound_data(self, file_path: Path, sound_name: str) -> Optional[Dict[str, Any]]:
+        """Декодирование файла и помещение звука в кэш"""
+        try:
+            # В дисковом кэше лежат только короткие звуки
+            cached = self.disk_cache.load(file_path) if self.disk_cache else None
+            info = sf.info(str(file_path)) if cached is None else None
+            if info is not None and self._should_stream(info):
+                # Ресемплинг до частоты микшера выполняет декодер потока
+                sound_data = {
+                    'data': None,
+                    'streaming': True,
+                    'sample_rate': self.sample_rate,
+                    'source_rate': info.samplerate,
+                    'duration': info.frames / info.samplerate,
+                    'file_path': str(file_path)
+                }
+                self.sounds.put(str(file_path), sound_data, alias=sound_name)
+                print(f"🌊 Streaming sound: {sound_name} ({file_path.name}, {info.duration:.2f}s)")
+                return sound_data
             
-            # Ищем файл используя новый метод
-            file_path = self.find_sound_file(sound_name)
+            if cached is not None:
+                data, sample_rate = cached
+                print(f"⚡ Mapped from PCM cache: {file_path.name}")
+            else:
+                print(f"📂 Loading: {file_path}")
+                data, sample_rate = self._decode_file(file_path)
+                if self.disk_cache:
+                    self.disk_cache.store(file_path, data, sample_rate)
             
-            if not file_path:
-                print(f"❌ Sound file not found: {sound_name}")
-                return False
+            sound_data = {
+                'data': data,
+                'streaming': False,
+                'sample_rate': sample_rate,
+                'duration': len(data) / sample_rate,
+                'file_path': str(file_path)
+            }
+            self.sounds.put(str(file_path), sound_data, alias=sound_name)
             
+            print(f"✅ Loaded sound: {sound_name} ({file_path.name}, {sound_data['duration']:.2f}s)")
+            return sound_data
+        except Exception as e:
+            print(f"❌ Error loading sound {sound_name}: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+    
+    def start_preload(self, sounds: Optional[List[str]] = None,
+                      priority: Optional[List[str]] = None) -> PreloadJob:
+        """Запуск фоновой предзагрузки
+        
+        sounds - какие звуки грузить (по умолчанию все из каталога),
+        priority - звуки, которые грузятся первыми (например, для следующей сцены).
+        """
+        if sounds is None:
+            sounds = [entry.name for entry in self.get_audio_files()]
+        
+        ordered: List[str] = []
+        seen: Set[str] = set()
+        for name in list(priority or []) + list(sounds):
+            if name not in seen:
+                seen.add(name)
+                ordered.append(name)
+        
+        sizes = {}
+        for name in ordered:
+            file_path = self.find_sound_file(name)
+            entry = self._catalog.get(file_path) if file_path else None
+            sizes[name] = entry.size if entry else 0
+        
+        job = PreloadJob(
+            id=uuid.uuid4().hex[:12],
+            sounds=ordered,
+            total_bytes=sum(sizes.values()),
+            started=time.time()
+        )
+        if not ordered:
+            job.state = 'done'
+            job.finished = job.started
+        
+        with self._jobs_lock:
+            self._preload_jobs[job.id] = job
+            # Вытесняются только завершенные и отмененные задачи: идущие
+            # должны оставаться доступны для прогресса, отмены и shutdown()
+            finished = [job_id for job_id, other in self._preload_jobs.items() if other.state != 'running']
+            for job_id in finished[:max(0, len(self._preload_jobs) - self.max_preload_jobs)]:
+                self._preload_jobs.pop(job_id, None)
+        
+        # Приоритетные звуки встают перед неприоритетными всех задач,
+        # внутри одного уровня - в порядке постановки
+        prioritized = set(priority or [])
+        with self._preload_cond:
+            self._preload_stopping = False
+            for name in ordered:
+                heapq.heappush(self._preload_queue, (
+                    0 if name in prioritized else 1, next(self._preload_order), job, name, sizes[name]
+                ))
+            self._preload_cond.notify(len(ordered))
+            self._preload_threads = [t for t in self._preload_threads if t.is_alive()]
+            while ordered and len(self._preload_threads) < self.preload_workers:
+                thread = threading.Thread(
+                    target=self._preload_worker,
+                    name=f'vvoid-preload-{len(self._preload_threads)}',
+                    daemon=True
+                )
+                thread.start()
+                self._preload_threads.append(thread)
+        
+        print(f"⏳ Preload job {job.id}: {len(ordered)} sounds ({len(priority or [])} prioritized)")
+        return job
+    
+    def _preload_worker(self):
+        """Поток предзагрузки: берет из общей очереди самый приоритетный звук"""
+        while True:
+            with self._preload_cond:
+                while not self._preload_queue and not self._preload_stopping:
+                    self._preload_cond.wait()
+                if self._preload_stopping:
+                    return
+                _, _, job, sound_name, size = heapq.heappop(self._preload_queue)
+            self._preload_one(job, sound_name, size)
+    
+    def _preload_one(self, job: PreloadJob, sound_name: str, size: int):
+        """Загрузка одного звука в рамках задачи"""
+        if job.cancelled:
+            return
+        job.record(size, self.load_sound(sound_name))
+    
+    def get_preload_job(self, job_id: str) -> Optional[PreloadJob]:
+        """Задача предзагрузки по ID"""
+        with self._jobs_lock:
+            return self._preload_jobs.get(job_id)
+    
+    def _list_preload_jobs(self) -> List[PreloadJob]:
+        with self._jobs_lock:
+            return list(self._preload_jobs.values())
+    
+    def _decode_file(self, file_path: Path) -> Tuple[np.ndarray, int]:
+        """Полное декодирование файла в float32 стерео на частоте микшера"""
+        data, sample_rate = sf.read(str(file_path), dtype='float32', always_2d=True)
+        
+        # Конвертируем в стерео если моно
+        if data.shape[1] == 1:
+            data = np.repeat(data, 2, axis=1)
+        elif data.shape[1] > 2:
+            data = data[:, :2]
+        
+        # Все звуки приводятся к одной частоте, чтобы суммироваться в одну шину
+        if sample_rate != self.sample_rate:
+            data = resample_linear(data, sample_rate, self.sample_rate)
+            sample_rate = self.sample_rate
+        
+        # Один буфер на все каналы: только чтение, без копий при play
+        data = np.ascontiguousarray(data)
+        data.setflags(write=False)
+        return data, sample_rate
+    
+    def build_disk_cache(self) -> int:
+        """Предварительно декодировать все короткие звуки в дисковый кэш"""
+        if self.disk_cache is None:
+            print("⚠️ PCM disk cache is not configured")
+            return 0
+        
+        if not self._file_index:
+            self._index_audio_files()
+        
+        built = 0
+        removed = self.disk_cache.prune()
+        if removed:
+            print(f"🧹 Removed {removed} stale PCM cache entries")
+        
+        for file_path in sorted(set(self._file_index.values())):
             try:
-                print(f"📂 Loading: {file_path}")
-                # Загружаем аудио файл
-                data, sample_rate = sf.read(str(file_path))
-                
-                # Конвертируем в стерео если моно
-                if len(data.shape) == 1:
-                    data = np.column_stack((data, data))
-                
-                # Нормализуем
-                if data.dtype != np.float32:
-                    data = data.astype(np.float32)
-                
-                self.sounds[sound_name] = {
-                    'data': data,
-                    'sample_rate': sample_rate,
-                    'duration': len(data) / sample_rate,
-                    'file_path': str(file_path)
-                }
-                
-                print(f"✅ Loaded sound: {sound_name} ({file_path.name}, {self.sounds[sound_name]['duration']:.2f}s)")
-                return True
+                if self.disk_cache.contains(file_path):
+                    continue
+                if self._should_stream(sf.info(str(file_path))):
+                    continue
+                data, sample_rate = self._decode_file(file_path)
+                self.disk_cache.store(file_path, data, sample_rate)
+                built += 1
+                print(f"💾 Cached PCM: {file_path.name}")
             except Exception as e:
-                print(f"❌ Error loading sound {sound_name}: {e}")
-                import traceback
-                traceback.print_exc()
-                return False
+                print(f"❌ Error caching {file_path.name}: {e}")
+        
+        print(f"✅ PCM cache ready: {built} new entries in {self.disk_cache.cache_dir}")
+        return built
+    
+    def _should_stream(self, info) -> bool:
+        """Нужно ли читать звук потоком вместо полной загрузки"""
+        decoded_bytes = info.frames * 2 * np.dtype(np.float32).itemsize
+        return (info.duration > self.stream_threshold_seconds or
+                decoded_bytes > self.stream_threshold_bytes)
     
     def play(self, sound_name: str, loops: int = 0, volume: float = 1.0, 
              fade_in: int = 0) -> Optional[int]:
-        """Воспроизведение звука, возвращает ID канала"""
-        with self._lock:
-            if not self.load_sound(sound_name):
-                return None
+        """Воспроизведение звука, возвращает ID канала (fade_in в мс)"""
+        # Параметры проверяются до создания канала: в callback попадают только числа
+        try:
+            loops = int(loops)
+            volume = float(volume)
+            fade_in = int(fade_in)
+            if not math.isfinite(volume):
+                raise ValueError(f"volume must be finite, got {volume}")
+        except (TypeError, ValueError) as e:
+            print(f"❌ Invalid play parameters for {sound_name}: {e}")
+            return None
+        volume = max(0.0, min(1.0, volume))
+        
+        # Загрузка (при промахе кэша) идёт без блокировки таблицы каналов
+        sound_data = self._get_sound(sound_name)
+        if sound_data is None:
+            return None
+        
+        # Доигранные каналы не занимают места, даже если поток очистки не успел
+        self._reap_finished()
+        
+        source = None
+        try:
+            if self.stream is None:
+                self._open_stream()
             
-            if len(self.channels) >= self.max_channels:
-                # Пытаемся найти и остановить завершенные каналы
-                self._cleanup_finished_channels()
-                if len(self.channels) >= self.max_channels:
-                    print("❌ No free channels available")
-                    return None
+            # Бесконечный цикл
+            if loops == -1:
+                loops = 999999
             
-            try:
-                sound_data = self.sounds[sound_name]
-                data = sound_data['data'].copy()
-                sample_rate = sound_data['sample_rate']
-                
-                # Применяем громкость
-                actual_volume = volume * self.global_volume
-                if self.muted:
-                    actual_volume = 0
-                
-                # Бесконечный цикл
-                if loops == -1:
-                    loops = 999999
-                
-                # Создаем поток для воспроизведения
-                def callback(outdata, frames, time_info, status):
-                    nonlocal loops
-                    if status:
-                        print(f"Audio status: {status}")
-                    
-                    # Определяем сколько данных нужно
-                    data_len = len(data)
-                    current_frame = getattr(callback, 'frame', 0)
-                    
-                    if current_frame + frames > data_len:
-                        if loops > 0:
-                            loops -= 1
-                            callback.frame = 0
-                            current_frame = 0
-                        else:
-                            outdata[:] = 0
-                            raise sd.CallbackStop()
-                    
-                    end_frame = min(current_frame + frames, data_len)
-                    chunk = data[current_frame:end_frame] * actual_volume
-                    
-                    if len(chunk) < frames:
-                        # Дополняем тишиной если нужно
-                        outdata[:len(chunk)] = chunk
-                        outdata[len(chunk):] = 0
-                    else:
-                        outdata[:] = chunk
-                    
-                    callback.frame = end_frame
-                
-                callback.frame = 0
-                
-                stream = sd.OutputStream(
-                    samplerate=sample_rate,
-                    channels=2,
-                    callback=callback,
-                    blocksize=1024,
-                    latency='low'
+            data = None
+            if sound_data.get('streaming'):
+                source = StreamingSource(
+                    Path(sound_data['file_path']),
+                    loops,
+                    int(self.sample_rate * self.stream_buffer_seconds),
+                    self.sample_rate
                 )
-                stream.start()
-                
-                # Сохраняем информацию о канале
-                channel_id = self.channel_counter
-                self.channel_counter += 1
-                
-                self.channels[channel_id] = ActiveChannel(
-                    id=channel_id,
-                    sound_name=sound_name,
-                    volume=volume,
-                    loops=loops,
-                    playing=True,
-                    paused=False,
-                    start_time=time.time(),
-                    stream=stream
-                )
-                
-                print(f"▶️ Playing [{channel_id}]: {sound_name} (vol: {actual_volume:.2f})")
-                return channel_id
-                
-            except Exception as e:
-                print(f"❌ Error playing sound: {e}")
-                import traceback
-                traceback.print_exc()
+                source.start()
+            else:
+                # Общий буфер только для чтения, каналы хранят лишь позицию
+                data = sound_data['data']
+            
+            # Канал - просто запись, его подхватит callback общего потока
+            channel = ActiveChannel(
+                id=-1,
+                sound_name=sound_name,
+                volume=volume,
+                loops=loops,
+                playing=True,
+                paused=False,
+                start_time=time.time(),
+                data=data,
+                source=source,
+                gain=0.0 if fade_in > 0 else volume,
+                file_path=sound_data['file_path']
+            )
+            if fade_in > 0:
+                self._start_ramp(channel, volume, fade_in)
+        except Exception as e:
+            if source is not None:
+                source.close()
+            print(f"❌ Error playing sound: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+        
+        # Публикация - последний шаг: дальше ничего не может упасть
+        channel_id = self._add_channel(channel)
+        if channel_id is None:
+            self._release_channel(channel)
+            print("❌ No free channels available")
+            return None
+        
+        print(f"▶️ Playing [{channel_id}]: {sound_name} (vol: {volume:.2f})")
+        return channel_id
+    
+    def _release_channel(self, channel: ActiveChannel):
+        """Остановка канала и его потокового декодера"""
+        channel.playing = False
+        if channel.source is not None:
+            channel.source.close()
+    
+    def _finish_channel(self, channel: ActiveChannel):
+        """Пометить канал завершенным (из callback), удалит его поток очистки"""
+        channel.playing = False
+        channel.ended = True
+        self._finished.append(channel.id)
+        self._finished_event.set()
+    
+    def _start_reaper(self):
+        """Запуск потока удаления завершенных каналов"""
+        if self._reaper is not None and self._reaper.is_alive():
+            return
+        self._reaper = threading.Thread(target=self._reap_loop, name='vvoid-reaper', daemon=True)
+        self._reaper.start()
+    
+    def _reap_loop(self):
+        while True:
+            self._finished_event.wait()
+            self._finished_event.clear()
+            if not self.initialized and not self._finished:
+                return
+            self._reap_finished()
+    
+    def _reap_finished(self):
+        """Удаление завершенных каналов из таблицы и остановка их декодеров"""
+        channel_ids = []
+        while True:
+            try:
+                channel_ids.append(self._finished.popleft())
+            except IndexError:
+                break
+        self._remove_channels(channel_ids)
+    
+    def _add_channel(self, channel: ActiveChannel) -> Optional[int]:
+        """Публикация нового канала, None если свободных каналов нет"""
+        with self._voice_lock:
+            if len(self.channels) >= self.max_channels:
                 return None
+            channel.id = self.channel_counter
+            self.channel_counter += 1
+            channels = dict(self.channels)
+            channels[channel.id] = channel
+            self.channels = channels
+        return channel.id
+    
+    def _remove_channels(self, channel_ids: List[int]):
+        """Удаление каналов из таблицы и остановка их декодеров"""
+        if not channel_ids:
+            return
+        with self._voice_lock:
+            channels = dict(self.channels)
+            removed = [channels.pop(cid) for cid in channel_ids if cid in channels]
+            self.channels = channels
+        for channel in removed:
+            self._release_channel(channel)
+    
+    def _start_ramp(self, channel: ActiveChannel, target: float, duration_ms: int,
+                    stop_after: bool = False):
+        """Запуск фейда канала к целевой громкости"""
+        duration_ms = max(duration_ms, self.min_ramp_ms)
+        frames = max(1, int(self.sample_rate * duration_ms / 1000))
+        channel.ramp = GainRamp(
+            target=target,
+            step=(target - channel.gain) / frames,
+            remaining=frames,
+            stop_after=stop_after
+        )
+    
+    def _select_channels(self, channel_id: Optional[int] = None,
+                         sound_name: Optional[str] = None) -> List[ActiveChannel]:
+        """Каналы по ID или по имени звука"""
+        # Завершенные каналы уже не управляются, только ждут удаления
+        if channel_id is not None:
+            channel = self.channels.get(channel_id)
+            return [channel] if channel and not channel.ended else []
+        if sound_name:
+            return [c for c in self.channels.values() if c.sound_name == sound_name and not c.ended]
+        return []
     
-    def _cleanup_finished_channels(self):
-        """Очистка завершенных каналов"""
+    def stop(self, channel_id: Optional[int] = None, sound_name: Optional[str] = None,
+             fade_out: int = 0):
+        """Остановка воспроизведения (fade_out в мс)"""
+        fade_out = int(fade_out)
+        self._reap_finished()
+        if channel_id is None and not sound_name:
+            targets = list(self.channels.values())
+        else:
+            targets = self._select_channels(channel_id, sound_name)
+        
         to_remove = []
-        for cid, channel in self.channels.items():
-            if not channel.playing and not channel.paused:
-                if channel.stream:
-                    try:
-                        channel.stream.close()
-                    except:
-                        pass
-                to_remove.append(cid)
-        
-        for cid in to_remove:
-            del self.channels[cid]
-    
-    def stop(self, channel_id: Optional[int] = None, sound_name: Optional[str] = None):
-        """Остановка воспроизведения"""
-        with self._lock:
-            if channel_id is not None and channel_id in self.channels:
-                channel = self.channels[channel_id]
-                if channel.stream:
-                    try:
-                        channel.stream.stop()
-                        channel.stream.close()
-                    except:
-                        pass
-                channel.playing = False
-                del self.channels[channel_id]
-                
-            elif sound_name:
-                to_remove = []
-                for cid, channel in self.channels.items():
-                    if channel.sound_name == sound_name:
-                        if channel.stream:
-                            try:
-                                channel.stream.stop()
-                                channel.stream.close()
-                            except:
-                                pass
-                        channel.playing = False
-                        to_remove.append(cid)
-                for cid in to_remove:
-                    del self.channels[cid]
+        for channel in targets:
+            if fade_out > 0 and channel.playing:
+                # Канал остановится сам в конце фейда
+                self._start_ramp(channel, 0.0, fade_out, stop_after=True)
             else:
-                self.stop_all()
+                to_remove.append(channel.id)
+        self._remove_channels(to_remove)
+    
+    def crossfade(self, sound_name: str, from_channel: Optional[int] = None,
+                  from_sound: Optional[str] = None, duration: int = 1000,
+                  loops: int = 0, volume: float = 1.0) -> Optional[int]:
+        """Плавная смена звука: новый нарастает, старый затухает (duration в мс)"""
+        duration = int(duration)
+        channel_id = self.play(sound_name, loops, volume, fade_in=duration)
+        if channel_id is None:
+            return None
+        
+        for channel in self._select_channels(from_channel, from_sound):
+            if channel.id != channel_id:
+                self._start_ramp(channel, 0.0, duration, stop_after=True)
+        return channel_id
     
     def pause(self, channel_id: Optional[int] = None):
         """Пауза"""
         if channel_id is not None and channel_id in self.channels:
-            channel = self.channels[channel_id]
-            if channel.stream:
-                channel.stream.stop()
+            targets = self._select_channels(channel_id)
+        else:
+            targets = [c for c in self.channels.values() if not c.ended]
+        for channel in targets:
             channel.paused = True
             channel.playing = False
-        else:
-            for channel in self.channels.values():
-                if channel.stream:
-                    channel.stream.stop()
-                channel.paused = True
-                channel.playing = False
     
     def unpause(self, channel_id: Optional[int] = None):
-        """Снятие с паузы"""
+        """Снятие с паузы (затихшие после stop/crossfade каналы не возобновляются)"""
         if channel_id is not None and channel_id in self.channels:
-            channel = self.channels[channel_id]
-            if channel.stream:
-                channel.stream.start()
+            targets = self._select_channels(channel_id)
+        else:
+            targets = [c for c in self.channels.values() if not c.ended]
+        for channel in targets:
             channel.paused = False
             channel.playing = True
-        else:
-            for channel in self.channels.values():
-                if channel.stream:
-                    channel.stream.start()
-                channel.paused = False
-                channel.playing = True
     
     def set_volume(self, channel_id: Optional[int] = None, 
-                   sound_name: Optional[str] = None, volume: float = 1.0):
-        """Установка громкости (требует перезапуска для применения)"""
-        volume = max(0.0, min(1.0, volume))
+                   sound_name: Optional[str] = None, volume: float = 1.0,
+                   fade: int = 0):
+        """Установка громкости канала на лету (fade в мс, например для приглушения музыки)"""
+        volume = max(0.0, min(1.0, float(volume)))
+        fade = int(fade)
         
-        if channel_id is not None and channel_id in self.channels:
-            self.channels[channel_id].volume = volume
-        elif sound_name:
-            for channel in self.channels.values():
-                if channel.sound_name == sound_name:
-                    channel.volume = volume
+        for channel in self._select_channels(channel_id, sound_name):
+            channel.volume = volume
+            self._start_ramp(channel, volume, fade)
     
     def set_global_volume(self, volume: float):
         """Установка глобальной громкости"""
-        self.global_volume = max(0.0, min(1.0, volume))
+        self.global_volume = max(0.0, min(1.0, float(volume)))
     
     def mute(self):
         """Включение беззвучного режима"""
@@ -360,64 +1464,75 @@ class AudioMixer:
     
     def stop_all(self):
         """Остановка всего"""
-        for channel in self.channels.values():
-            if channel.stream:
-                try:
-                    channel.stream.stop()
-                    channel.stream.close()
-                except:
-                    pass
-        self.channels.clear()
+        with self._voice_lock:
+            channels = self.channels
+            self.channels = {}
+        for channel in channels.values():
+            self._release_channel(channel)
     
     def get_audio_files(self) -> List[AudioFile]:
-        """Получить список доступных аудио файлов"""
-        audio_files = []
-        supported_formats = {'.mp3', '.wav', '.ogg', '.flac', '.m4a'}
-        
-        if self.audio_dir.exists():
-            for file_path in self.audio_dir.rglob('*'):
-                if file_path.suffix.lower() in supported_formats:
-                    # Получаем длительность если файл загружен
-                    duration = 0.0
-                    if file_path.stem in self.sounds:
-                        duration = self.sounds[file_path.stem]['duration']
-                    
-                    audio_files.append(AudioFile(
-                        name=file_path.stem,
-                        filename=file_path.name,
-                        path=str(file_path.relative_to(self.audio_dir)),
-                        size=file_path.stat().st_size,
-                        loaded=file_path.stem in self.sounds,
-                        duration=duration
-                    ))
+        """Получить список доступных аудио файлов (из каталога, без обхода диска)"""
+        catalog = self._catalog_sorted
+        if catalog is None:
+            catalog = sorted(self._catalog.values(), key=lambda x: x.name)
+            self._catalog_sorted = catalog
         
-        return sorted(audio_files, key=lambda x: x.name)
+        audio_files = []
+        for entry in catalog:
+            # Получаем длительность если файл загружен
+            sound_data = self.sounds.peek(str(self.audio_dir / entry.path))
+            audio_files.append(replace(
+                entry,
+                loaded=sound_data is not None,
+                duration=sound_data['duration'] if sound_data else 0.0
+            ))
+        return audio_files
     
     def get_status(self) -> dict:
         """Получить статус микшера"""
+        self._reap_finished()
         return {
             'initialized': self.initialized,
             'global_volume': self.global_volume,
             'muted': self.muted,
             'active_channels': len(self.channels),
+            'sample_rate': self.sample_rate,
+            'output_stream': self.stream is not None and self.stream.active,
             'loaded_sounds': len(self.sounds),
+            'cache': self.sounds.stats(),
+            'preload_jobs': [job.progress() for job in self._list_preload_jobs()
+                             if job.state == 'running'],
             'indexed_files': len(self._file_index),
-            'available_files': len(self.get_audio_files()),
+            'available_files': len(self._catalog),
             'audio_directory': str(self.audio_dir),
             'channels': [
                 {
                     'id': cid,
                     'sound': info.sound_name,
                     'volume': info.volume,
+                    'gain': info.gain,
+                    'fading': info.ramp is not None,
                     'loops': info.loops if info.loops < 999999 else -1,
                     'playing': info.playing,
                     'paused': info.paused,
+                    'streaming': info.source is not None,
                     'elapsed': time.time() - info.start_time
                 }
                 for cid, info in self.channels.items()
             ]
         }
 
+def request_number(data: dict, field: str, default, kind: type = float):
+    """Числовой параметр JSON запроса ("0.5" тоже подходит), ValueError если не число"""
+    value = data.get(field, default)
+    try:
+        number = kind(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{field}' must be a number")
+    if not math.isfinite(number):
+        raise ValueError(f"'{field}' must be a finite number")
+    return number
+
 class VoidAudioExtension:
     """Расширение для работы с аудио"""
     
@@ -426,7 +1541,7 @@ class VoidAudioExtension:
             audio_dir = Path("data/scenes/assets/audio")
         
         self.audio_dir = Path(audio_dir)
-        self.mixer = AudioMixer(self.audio_dir)
+        self.mixer = AudioMixer(self.audio_dir, pcm_cache_dir=Path("data/cache/audio"))
         self.name = "vvoid"
         self.version = "1.0.0"
         self.blueprint = None
@@ -444,6 +1559,17 @@ class VoidAudioExtension:
             traceback.print_exc()
             return False
     
+    def prefetch_sounds(self, sounds: List[str]):
+        """Фоновая загрузка звуков следующих сцен"""
+        missing = [name for name in dict.fromkeys(sounds) if name not in self.mixer.sounds]
+        if missing and self.mixer.initialized:
+            self.mixer.start_preload(missing, priority=missing)
+    
+    def on_files_changed(self, changes: List[Tuple[str, str]]):
+        """Изменения файлов проекта от наблюдателя сервера сцен"""
+        if self.mixer.initialized:
+            self.mixer.apply_file_changes(changes)
+    
     def shutdown(self):
         """Завершение работы"""
         self.mixer.shutdown()
@@ -475,12 +1601,15 @@ class VoidAudioExtension:
             """Воспроизвести звук"""
             data = request.get_json() or {}
             sound = data.get('sound')
-            loops = data.get('loops', 0)
-            volume = data.get('volume', 1.0)
-            fade_in = data.get('fade_in', 0)
             
             if not sound:
                 return jsonify({'error': 'Sound name required'}), 400
+            try:
+                loops = request_number(data, 'loops', 0, int)
+                volume = request_number(data, 'volume', 1.0)
+                fade_in = request_number(data, 'fade_in', 0, int)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
             
             channel_id = self.mixer.play(sound, loops, volume, fade_in)
             if channel_id is not None:
@@ -494,20 +1623,12 @@ class VoidAudioExtension:
         @self.blueprint.route('/search', methods=['GET'])
         def search_sounds():
             """Поиск звуков по имени"""
-            query = request.args.get('q', '').lower()
+            query = request.args.get('q', '')
             if not query:
                 return jsonify({'error': 'Search query required'}), 400
             
-            results = []
-            for name, path in self.mixer._file_index.items():
-                if query in name.lower():
-                    results.append({
-                        'name': name,
-                        'path': str(path.relative_to(self.audio_dir)),
-                        'loaded': name in self.mixer.sounds
-                    })
-            
-            return jsonify({'results': results[:20]})  # Ограничиваем результаты
+            limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+            return jsonify({'results': self.mixer.search_sounds(query, limit)})
         
         @self.blueprint.route('/stop', methods=['POST'])
         def stop_sound():
@@ -515,10 +1636,49 @@ class VoidAudioExtension:
             data = request.get_json() or {}
             channel_id = data.get('channel_id')
             sound_name = data.get('sound')
+            try:
+                fade_out = request_number(data, 'fade_out', 0, int)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
             
-            self.mixer.stop(channel_id, sound_name)
+            self.mixer.stop(channel_id, sound_name, fade_out)
             return jsonify({'success': True})
         
+        @self.blueprint.route('/crossfade', methods=['POST'])
+        def crossfade():
+            """Плавно сменить звук"""
+            data = request.get_json() or {}
+            sound = data.get('sound')
+            from_channel = data.get('from_channel')
+            from_sound = data.get('from_sound')
+            
+            if not sound:
+                return jsonify({'error': 'Sound name required'}), 400
+            if from_channel is None and not from_sound:
+                return jsonify({'error': 'from_channel or from_sound required'}), 400
+            try:
+                duration = request_number(data, 'duration', 1000, int)
+                loops = request_number(data, 'loops', 0, int)
+                volume = request_number(data, 'volume', 1.0)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            channel_id = self.mixer.crossfade(
+                sound,
+                from_channel=from_channel,
+                from_sound=from_sound,
+                duration=duration,
+                loops=loops,
+                volume=volume
+            )
+            if channel_id is not None:
+                return jsonify({
+                    'success': True,
+                    'channel_id': channel_id,
+                    'sound': sound
+                })
+            return jsonify({'error': 'Failed to play sound'}), 500
+        
         @self.blueprint.route('/pause', methods=['POST'])
         def pause_sound():
             """Поставить на паузу"""
@@ -543,13 +1703,19 @@ class VoidAudioExtension:
             data = request.get_json() or {}
             channel_id = data.get('channel_id')
             sound_name = data.get('sound')
-            volume = data.get('volume', 1.0)
-            global_vol = data.get('global')
+            try:
+                volume = request_number(data, 'volume', 1.0)
+                global_vol = data.get('global')
+                if global_vol is not None:
+                    global_vol = request_number(data, 'global', None)
+                fade = request_number(data, 'fade', 0, int)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
             
             if global_vol is not None:
                 self.mixer.set_global_volume(global_vol)
             else:
-                self.mixer.set_volume(channel_id, sound_name, volume)
+                self.mixer.set_volume(channel_id, sound_name, volume, fade)
             
             return jsonify({'success': True})
         
@@ -580,18 +1746,39 @@ class VoidAudioExtension:
         
         @self.blueprint.route('/preload-all', methods=['POST'])
         def preload_all():
-            """Предзагрузить все аудио файлы"""
-            files = self.mixer.get_audio_files()
-            loaded = 0
-            for file in files:
-                if self.mixer.load_sound(file.name):
-                    loaded += 1
-            
-            return jsonify({
-                'success': True,
-                'total': len(files),
-                'loaded': loaded
-            })
+            """Предзагрузить все аудио файлы (фоновая задача)"""
+            data = request.get_json(silent=True) or {}
+            job = self.mixer.start_preload(priority=data.get('priority'))
+            return jsonify({'success': True, **job.progress()}), 202
+        
+        @self.blueprint.route('/preload', methods=['POST'])
+        def preload():
+            """Предзагрузить выбранные звуки (фоновая задача)"""
+            data = request.get_json() or {}
+            sounds = data.get('sounds')
+            
+            if not sounds:
+                return jsonify({'error': 'Sound names required'}), 400
+            
+            job = self.mixer.start_preload(sounds, priority=data.get('priority'))
+            return jsonify({'success': True, **job.progress()}), 202
+        
+        @self.blueprint.route('/preload/<job_id>', methods=['GET'])
+        def preload_progress(job_id):
+            """Прогресс предзагрузки"""
+            job = self.mixer.get_preload_job(job_id)
+            if job is None:
+                return jsonify({'error': 'Job not found'}), 404
+            return jsonify(job.progress())
+        
+        @self.blueprint.route('/preload/<job_id>/cancel', methods=['POST'])
+        def preload_cancel(job_id):
+            """Отменить предзагрузку"""
+            job = self.mixer.get_preload_job(job_id)
+            if job is None:
+                return jsonify({'error': 'Job not found'}), 404
+            job.cancel()
+            return jsonify({'success': True, **job.progress()})
         
         @self.blueprint.route('/stop-all', methods=['POST'])
         def stop_all():
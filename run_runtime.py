@@ -1,12 +1,24 @@
-from flask import Flask, render_template, send_from_directory, abort, render_template_string
+from flask import Flask, render_template, send_from_directory, abort, make_response, request, Response, g, jsonify
+from jinja2 import meta as jinja_meta, TemplateSyntaxError
+from werkzeug.http import parse_date, quote_etag, unquote_etag
+from werkzeug.security import safe_join
+import gzip
+import hashlib
+import mimetypes
 import os
+import posixpath
+import re
 import sys
 import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from stat import S_ISREG
 from pathlib import Path
 from PyQt5.QtCore import QUrl
 from PyQt5.QtWidgets import QApplication, QMainWindow
 from PyQt5.QtWebEngineWidgets import QWebEngineView
-from data.extensions.extension_manager import ExtensionManager
+from data.extensions.extension_manager import ExtensionManager, run_wsgi_server
 
 app = Flask(__name__)
 
@@ -14,11 +26,418 @@ app = Flask(__name__)
 BASE_DIR = Path(__file__).parent  # Папка, где лежит скрипт
 TEMPLATES_DIR = BASE_DIR / 'data' / 'scenes' / 'templates'
 ASSETS_DIR = BASE_DIR / 'data' / 'scenes' / 'assets'
+CACHE_DIR = BASE_DIR / 'data' / 'cache'
 
 # Настройка путей для Flask
 app.template_folder = str(TEMPLATES_DIR)
 app.static_folder = str(ASSETS_DIR)
 app.static_url_path = '/assets'
+# Скомпилированные шаблоны не вытесняются из кэша Jinja и перечитываются
+# при изменении файла; готовый HTML статических сцен кэшируется в render_cached
+app.config['TEMPLATES_AUTO_RELOAD'] = True
+app.jinja_options = {**app.jinja_options, 'cache_size': -1}
+
+# Менеджер расширений (создается в run_extensions)
+ext_manager = None
+
+# Параметры HTTP серверов (--production, --threads N, --keep-alive S)
+SERVER_OPTIONS = {
+    'production': False,
+    'threads': 8,
+    'keep_alive': 120,
+}
+
+# Адрес API расширений для сцен: в режиме --single-port тот же origin
+EXTENSION_API_BASE = 'http://127.0.0.1:5001'
+
+# Расширения загружаются при первом запросе к их API (--lazy-extensions)
+LAZY_EXTENSIONS = False
+
+# Каждое расширение в отдельном процессе (--isolate-extensions)
+ISOLATE_EXTENSIONS = False
+
+@app.context_processor
+def inject_runtime_globals():
+    """Глобальные переменные шаблонов: {{ extension_api_base }}/audio/play"""
+    return {'extension_api_base': EXTENSION_API_BASE}
+
+# ====== HTTP кэширование ассетов ======
+
+ASSET_MAX_AGE = 3600  # Cache-Control для обычных ссылок на ассеты (--asset-max-age)
+IMMUTABLE_MAX_AGE = 31536000  # Для ссылок с отпечатком ?v=<hash>
+FINGERPRINT_LENGTH = 12
+
+ETAG_INLINE_HASH_LIMIT = 1024 * 1024  # Файлы крупнее хэшируются в фоне
+
+_etag_cache = {}  # {путь: (mtime_ns, size, etag)}
+_etag_pending = set()  # Ассеты, которые сейчас хэшируются в фоне
+_etag_lock = threading.Lock()
+_etag_executor = None
+
+def _hash_file(file_path):
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _stat_etag(stat):
+    """Временный ETag по mtime и размеру, пока хэш содержимого не готов"""
+    return hashlib.sha1(f"{stat.st_mtime_ns}-{stat.st_size}".encode('ascii')).hexdigest()
+
+def _hash_asset(filename):
+    """Фоновый расчет хэша ассета"""
+    try:
+        file_path = safe_join(str(ASSETS_DIR), filename)
+        stat = os.stat(file_path)
+        cached = _etag_cache.get(filename)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return
+        etag = _hash_file(file_path)
+        # Файл мог измениться во время хэширования - посчитаем при следующем запросе
+        current = os.stat(file_path)
+        if (current.st_mtime_ns, current.st_size) != (stat.st_mtime_ns, stat.st_size):
+            return
+        _etag_cache[filename] = (stat.st_mtime_ns, stat.st_size, etag)
+        # В закэшированном HTML остался временный отпечаток asset_url()
+        _invalidate_rendered(os.path.abspath(file_path))
+    except (OSError, TypeError):
+        pass
+    finally:
+        with _etag_lock:
+            _etag_pending.discard(filename)
+
+def schedule_asset_hash(filename):
+    """Поставить ассет в очередь фонового хэширования"""
+    global _etag_executor
+    with _etag_lock:
+        if filename in _etag_pending:
+            return
+        _etag_pending.add(filename)
+        if _etag_executor is None:
+            _etag_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='asset-etag')
+    _etag_executor.submit(_hash_asset, filename)
+
+def get_asset_etag(filename):
+    """ETag по содержимому файла: хэш считается один раз на версию файла
+    
+    Крупные файлы (видео) хэшируются в фоне, чтобы первый запрос не ждал
+    чтения всего файла; до готовности хэша ETag строится по mtime и размеру.
+    """
+    file_path = safe_join(str(ASSETS_DIR), filename)
+    if file_path is None or not os.path.isfile(file_path):
+        return None
+    
+    stat = os.stat(file_path)
+    cached = _etag_cache.get(filename)
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+    
+    if stat.st_size > ETAG_INLINE_HASH_LIMIT:
+        schedule_asset_hash(filename)
+        return _stat_etag(stat)
+    
+    etag = _hash_file(file_path)
+    _etag_cache[filename] = (stat.st_mtime_ns, stat.st_size, etag)
+    return etag
+
+@app.template_global()
+def asset_url(filename):
+    """URL ассета с отпечатком содержимого: {{ asset_url('css/style.css') }}
+    
+    Такие ссылки кэшируются браузером навсегда, при изменении файла меняется URL.
+    """
+    etag = get_asset_etag(filename)
+    if etag is None:
+        return f"/assets/{filename}"
+    # Отпечаток попадает в HTML - ассет становится зависимостью кэша рендера
+    asset_deps = g.get('asset_deps')
+    if asset_deps is not None:
+        asset_deps.add(filename)
+    return f"/assets/{filename}?v={etag[:FINGERPRINT_LENGTH]}"
+
+# ====== Предварительно сжатые ассеты (.gz / .br) ======
+
+PRECOMPRESS_EXTENSIONS = {'.css', '.js', '.mjs', '.json', '.svg', '.txt', '.xml', '.map'}
+PRECOMPRESS_MIN_SIZE = 1024  # Мелкие файлы сжимать нет смысла
+PRECOMPRESSED_SUFFIXES = (('br', '.br'), ('gzip', '.gz'))  # В порядке предпочтения
+
+def _compressors():
+    """Доступные кодировки: {'gzip': функция, 'br': функция}"""
+    compressors = {'gzip': lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+        compressors['br'] = lambda data: brotli.compress(data, quality=11)
+    except ImportError:
+        print("⚠️ brotli is not installed, only .gz variants will be built")
+        print("   Please install: pip install brotli")
+    return compressors
+
+def is_precompressed_variant(path):
+    """Файл .gz/.br, созданный --precompress рядом с оригиналом"""
+    path = Path(path)
+    return path.suffix in ('.gz', '.br') and path.with_suffix('').suffix in PRECOMPRESS_EXTENSIONS
+
+def precompress_assets():
+    """Сжатие текстовых ассетов в .gz и .br рядом с оригиналами
+    
+    Вариант получает mtime оригинала: при изменении оригинала вариант
+    перестает отдаваться, пока сборка не будет запущена снова.
+    """
+    compressors = _compressors()
+    built = skipped = 0
+    
+    for file_path in sorted(ASSETS_DIR.rglob('*')):
+        if not file_path.is_file() or file_path.suffix not in PRECOMPRESS_EXTENSIONS:
+            continue
+        stat = file_path.stat()
+        data = None
+        
+        for encoding, suffix in PRECOMPRESSED_SUFFIXES:
+            if encoding not in compressors:
+                continue
+            variant = file_path.with_name(file_path.name + suffix)
+            try:
+                if variant.stat().st_mtime_ns == stat.st_mtime_ns:
+                    skipped += 1
+                    continue
+            except OSError:
+                pass
+            
+            if data is None:
+                data = file_path.read_bytes()
+            compressed = compressors[encoding](data) if len(data) >= PRECOMPRESS_MIN_SIZE else data
+            if len(compressed) >= len(data):
+                # Сжатие не дает выигрыша - отдаем оригинал
+                variant.unlink(missing_ok=True)
+                continue
+            
+            tmp_path = variant.with_name(variant.name + '.tmp')
+            tmp_path.write_bytes(compressed)
+            os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            os.replace(tmp_path, variant)
+            built += 1
+            print(f"🗜️ {file_path.relative_to(ASSETS_DIR)}{suffix}: {len(data)} -> {len(compressed)} bytes")
+    
+    print(f"✅ Precompressed {built} variants ({skipped} up to date)")
+
+def find_precompressed(filename):
+    """Подходящий клиенту сжатый вариант ассета: (кодировка, имя файла) или None
+    
+    Вариант используется только если его mtime совпадает с оригиналом.
+    """
+    if Path(filename).suffix not in PRECOMPRESS_EXTENSIONS:
+        return None
+    file_path = safe_join(str(ASSETS_DIR), filename)
+    mtime_ns = os.stat(file_path).st_mtime_ns
+    
+    for encoding, suffix in PRECOMPRESSED_SUFFIXES:
+        if not request.accept_encodings[encoding]:
+            continue
+        try:
+            if os.stat(file_path + suffix).st_mtime_ns == mtime_ns:
+                return encoding, filename + suffix
+        except OSError:
+            continue
+    return None
+
+# ====== Range запросы (перемотка видео и аудио) ======
+
+RANGE_CHUNK_SIZE = 256 * 1024
+MAX_RANGES = 16  # Больше диапазонов в одном запросе не обслуживаем
+
+def parse_byte_ranges(value):
+    """Разбор заголовка Range: [(start, stop|None)], отрицательный start - суффикс
+    
+    В отличие от werkzeug допускает пересекающиеся и неупорядоченные диапазоны,
+    они объединяются при ответе. Пустой список - ни один диапазон не выполним.
+    """
+    if not value or '=' not in value:
+        return None
+    units, _, spec = value.partition('=')
+    if units.strip().lower() != 'bytes':
+        return None
+    
+    ranges = []
+    parsed = False
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        first, sep, last = item.partition('-')
+        if not sep:
+            return None
+        try:
+            if not first:
+                suffix = int(last)
+                parsed = True
+                # bytes=-0 - пустой суффикс, невыполнимый диапазон
+                if suffix > 0:
+                    ranges.append((-suffix, None))
+                continue
+            start = int(first)
+            stop = int(last) + 1 if last else None
+        except ValueError:
+            return None
+        if stop is not None and stop <= start:
+            return None
+        ranges.append((start, stop))
+        parsed = True
+    return ranges if parsed else None
+
+def if_range_matches(if_range, etag, mtime):
+    """If-Range совпадает с текущей версией файла: по ETag или по дате Last-Modified"""
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        value, weak = unquote_etag(if_range)
+        return not weak and value == etag
+    date = parse_date(if_range)
+    return date is not None and int(date.timestamp()) == int(mtime)
+
+def _iter_file_ranges(file_path, parts, trailer=b''):
+    """Чтение диапазонов файла блоками: файл никогда не читается целиком
+    
+    parts - список (заголовок части, начало, конец)
+    """
+    with open(file_path, 'rb') as f:
+        for header, start, stop in parts:
+            if header:
+                yield header
+            f.seek(start)
+            remaining = stop - start
+            while remaining > 0:
+                chunk = f.read(min(RANGE_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+    if trailer:
+        yield trailer
+
+def send_multirange(filename, etag, byte_ranges):
+    """Ответ 206 multipart/byteranges для нескольких диапазонов"""
+    file_path = safe_join(str(ASSETS_DIR), filename)
+    stat = os.stat(file_path)
+    length = stat.st_size
+    
+    # Приводим к абсолютным границам и объединяем пересекающиеся диапазоны
+    spans = []
+    for start, stop in byte_ranges:
+        if stop is None:
+            stop = length
+            if start < 0:
+                start = max(length + start, 0)
+        stop = min(stop, length)
+        if start < stop:
+            spans.append((start, stop))
+    if not spans:
+        return Response(status=416, headers={'Content-Range': f'bytes */{length}'})
+    
+    spans.sort()
+    merged = [list(spans[0])]
+    for start, stop in spans[1:]:
+        if start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], stop)
+        else:
+            merged.append([start, stop])
+    
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    headers = {
+        'ETag': quote_etag(etag),
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': f'public, max-age={ASSET_MAX_AGE}',
+    }
+    
+    if len(merged) == 1:
+        start, stop = merged[0]
+        headers['Content-Range'] = f'bytes {start}-{stop - 1}/{length}'
+        headers['Content-Length'] = str(stop - start)
+        response = Response(_iter_file_ranges(file_path, [(b'', start, stop)]), 206,
+                            mimetype=mimetype, headers=headers, direct_passthrough=True)
+        response.last_modified = stat.st_mtime
+        return response
+    
+    boundary = hashlib.sha1(f'{etag}{merged}'.encode()).hexdigest()[:24]
+    parts = []
+    total = 0
+    for start, stop in merged:
+        header = (f'\r\n--{boundary}\r\n'
+                  f'Content-Type: {mimetype}\r\n'
+                  f'Content-Range: bytes {start}-{stop - 1}/{length}\r\n\r\n').encode('ascii')
+        parts.append((header, start, stop))
+        total += len(header) + stop - start
+    trailer = f'\r\n--{boundary}--\r\n'.encode('ascii')
+    total += len(trailer)
+    
+    headers['Content-Length'] = str(total)
+    response = Response(_iter_file_ranges(file_path, parts, trailer), 206,
+                        content_type=f'multipart/byteranges; boundary={boundary}',
+                        headers=headers, direct_passthrough=True)
+    response.last_modified = stat.st_mtime
+    return response
+
+def send_asset(filename):
+    """Отдача ассета с ETag, Last-Modified, Cache-Control и ответами 304
+    
+    Один диапазон Range обслуживает werkzeug (206 через file wrapper),
+    несколько - send_multirange.
+    """
+    etag = get_asset_etag(filename)
+    if etag is None:
+        abort(404)
+    
+    range_header = request.headers.get('Range')
+    byte_ranges = parse_byte_ranges(range_header)
+    if byte_ranges is not None and (len(byte_ranges) > 1 or ',' in range_header):
+        # If-Range с другой версией файла или слишком много диапазонов - файл целиком
+        mtime = os.stat(safe_join(str(ASSETS_DIR), filename)).st_mtime
+        if (len(byte_ranges) <= MAX_RANGES
+                and if_range_matches(request.headers.get('If-Range'), etag, mtime)
+                and not request.if_none_match.contains(etag)):
+            return send_multirange(filename, etag, byte_ranges)
+        # werkzeug обслуживает только один диапазон, иначе ответил бы 416
+        request.environ.pop('HTTP_RANGE', None)
+    
+    fingerprinted = request.args.get('v') == etag[:FINGERPRINT_LENGTH]
+    compressible = Path(filename).suffix in PRECOMPRESS_EXTENSIONS
+    precompressed = find_precompressed(filename) if compressible else None
+    
+    if precompressed:
+        # Сжатый вариант - отдельное представление со своим ETag
+        encoding, variant = precompressed
+        response = send_from_directory(
+            str(ASSETS_DIR),
+            variant,
+            mimetype=mimetypes.guess_type(filename)[0],
+            etag=f'{etag}-{encoding}',
+            conditional=True,
+            max_age=IMMUTABLE_MAX_AGE if fingerprinted else ASSET_MAX_AGE
+        )
+        response.headers['Content-Encoding'] = encoding
+    else:
+        response = send_from_directory(
+            str(ASSETS_DIR),
+            filename,
+            etag=etag,
+            conditional=True,
+            max_age=IMMUTABLE_MAX_AGE if fingerprinted else ASSET_MAX_AGE
+        )
+    if compressible:
+        response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    if fingerprinted:
+        response.cache_control.immutable = True
+    return response
+
+def get_arg_value(flag, default=None):
+    """Значение флага командной строки вида --flag value или --flag=value"""
+    for i, arg in enumerate(sys.argv):
+        if arg == flag and i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
+        if arg.startswith(flag + '='):
+            return arg.split('=', 1)[1]
+    return default
 
 def create_project_structure():
     """Создание структуры проекта с необходимыми папками"""
@@ -57,37 +476,778 @@ def create_project_structure():
     
     print("✅ Project created successfully!")
 
+def build_audio_cache():
+    """Предварительное декодирование аудио в дисковый PCM кэш"""
+    from data.extensions.vvoid.main import AudioMixer
+    
+    mixer = AudioMixer(ASSETS_DIR / 'audio', pcm_cache_dir=CACHE_DIR / 'audio')
+    mixer.build_disk_cache()
+
+def bench_media(filename, clients=8, requests_per_client=50, chunk_size=256 * 1024):
+    """Нагрузочный тест перемотки: параллельные Range запросы к ассету
+    
+    Поднимает сервер сцен на свободном порту и из clients потоков
+    запрашивает случайные диапазоны, как при перемотке видео.
+    """
+    import http.client
+    import random
+    import socket
+    import statistics
+    
+    file_path = ASSETS_DIR / filename
+    if not file_path.is_file():
+        print(f"❌ Asset not found: {file_path}")
+        return
+    length = file_path.stat().st_size
+    
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    threading.Thread(target=run_wsgi_server, args=(app, '127.0.0.1', port),
+                     kwargs=SERVER_OPTIONS, daemon=True).start()
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    
+    url = '/assets/' + filename.replace(os.sep, '/')
+    latencies = []
+    errors = []
+    received = [0]
+    lock = threading.Lock()
+    
+    def client():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local = []
+        local_bytes = 0
+        for _ in range(requests_per_client):
+            start = random.randrange(length)
+            stop = min(start + chunk_size, length) - 1
+            began = time.perf_counter()
+            conn.request('GET', url, headers={'Range': f'bytes={start}-{stop}'})
+            response = conn.getresponse()
+            body = response.read()
+            local.append(time.perf_counter() - began)
+            local_bytes += len(body)
+            if response.status != 206 or len(body) != stop - start + 1:
+                with lock:
+                    errors.append(response.status)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            received[0] += local_bytes
+    
+    print(f"🎬 {filename}: {length} bytes, {clients} clients x {requests_per_client} seeks")
+    began = time.perf_counter()
+    workers = [threading.Thread(target=client) for _ in range(clients)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - began
+    
+    latencies.sort()
+    print(f"   requests: {len(latencies)}, errors: {len(errors)}, {len(latencies) / elapsed:.1f} req/s")
+    print(f"   latency p50: {statistics.median(latencies) * 1000:.2f} ms, "
+          f"p95: {latencies[int(len(latencies) * 0.95) - 1] * 1000:.2f} ms, "
+          f"max: {latencies[-1] * 1000:.2f} ms")
+    print(f"   throughput: {received[0] / elapsed / 1024 / 1024:.1f} MB/s")
+
+# ====== Индексы файлов проекта и наблюдатель за изменениями ======
+
+WATCH_FILES = True  # --no-watch отключает наблюдатель
+WATCH_DEBOUNCE = 0.2  # Пачка событий собирается перед обработкой
+WATCH_POLL_INTERVAL = 1.0  # Период опроса, если watchdog не установлен
+
+class FileIndex:
+    """Множество файлов папки с кэшированным отсортированным списком"""
+    
+    def __init__(self, files=()):
+        self._files = set(files)
+        self._sorted = None
+    
+    def __contains__(self, name):
+        return name in self._files
+    
+    def __len__(self):
+        return len(self._files)
+    
+    def __iter__(self):
+        return iter(self.sorted())
+    
+    def add(self, name):
+        if name not in self._files:
+            self._files.add(name)
+            self._sorted = None
+    
+    def discard(self, name):
+        if name in self._files:
+            self._files.discard(name)
+            self._sorted = None
+    
+    def sorted(self):
+        listing = self._sorted
+        if listing is None:
+            listing = sorted(self._files)
+            self._sorted = listing
+        return listing
+
+class FileWatcher:
+    """Наблюдатель за папками проекта
+    
+    События приходят от watchdog (inotify, FSEvents, ReadDirectoryChangesW),
+    без него папки периодически опрашиваются. Подписчики получают пачки
+    изменений [(тип, абсолютный путь)], тип - 'created', 'modified' или 'deleted'.
+    """
+    
+    def __init__(self, roots, debounce=WATCH_DEBOUNCE, poll_interval=WATCH_POLL_INTERVAL):
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.backend = None
+        self._files = {}  # {путь: (mtime_ns, size)}
+        self._subscribers = []
+        self._dirty = set()
+        self._dirty_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._observer = None
+    
+    def subscribe(self, callback):
+        """callback(changes) вызывается из потока наблюдателя"""
+        self._subscribers.append(callback)
+    
+    def scan(self):
+        """Начальный снимок всех папок"""
+        for root in self.roots:
+            self._files.update(self._scan(root))
+    
+    def files(self, root):
+        """Пути файлов под папкой по текущему снимку"""
+        prefix = os.path.abspath(root) + os.sep
+        return [path for path in self._files if path.startswith(prefix)]
+    
+    @staticmethod
+    def _signature(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size) if S_ISREG(stat.st_mode) else None
+    
+    def _scan(self, path):
+        """Файлы под путем на диске: {путь: (mtime_ns, size)}"""
+        if not os.path.isdir(path):
+            signature = self._signature(path)
+            return {path: signature} if signature else {}
+        
+        found = {}
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                file_path = os.path.join(dirpath, filename)
+                signature = self._signature(file_path)
+                if signature:
+                    found[file_path] = signature
+        return found
+    
+    def _collect(self, paths):
+        """Сравнение снимка с диском для путей, список изменений"""
+        changes = []
+        for path in paths:
+            found = self._scan(path)
+            if path in self._files and path in found:
+                known = {path: self._files[path]}
+            else:
+                # Папка или удаленный путь: сравниваем всё поддерево
+                prefix = path + os.sep
+                known = {p: s for p, s in self._files.items() if p == path or p.startswith(prefix)}
+            
+            for file_path in known.keys() - found.keys():
+                del self._files[file_path]
+                changes.append(('deleted', file_path))
+            for file_path, signature in found.items():
+                previous = known.get(file_path)
+                if previous != signature:
+                    self._files[file_path] = signature
+                    changes.append(('created' if previous is None else 'modified', file_path))
+        return changes
+    
+    def _mark(self, path):
+        with self._dirty_lock:
+            self._dirty.add(os.path.abspath(path))
+        self._wakeup.set()
+    
+    def start(self):
+        """Запуск наблюдения (после scan)"""
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            print("⚠️ watchdog is not installed, polling for file changes")
+            print("   Please install: pip install watchdog")
+            self.backend = 'polling'
+        else:
+            watcher = self
+            
+            class Handler(FileSystemEventHandler):
+                def on_any_event(self, event):
+                    if event.event_type in ('opened', 'closed_no_write'):
+                        return
+                    # Изменение папки сопровождает каждое создание или удаление
+                    # файла в ней, сам файл приходит отдельным событием
+                    if event.is_directory and event.event_type == 'modified':
+                        return
+                    watcher._mark(event.src_path)
+                    if getattr(event, 'dest_path', None):
+                        watcher._mark(event.dest_path)
+            
+            self._observer = Observer()
+            for root in self.roots:
+                if os.path.isdir(root):
+                    self._observer.schedule(Handler(), root, recursive=True)
+            self._observer.daemon = True
+            self._observer.start()
+            self.backend = 'watchdog'
+        
+        threading.Thread(target=self._run, daemon=True).start()
+        print(f"👀 Watching {len(self._files)} files ({self.backend})")
+    
+    def _run(self):
+        while not self._stopped.is_set():
+            if self.backend == 'polling':
+                if self._stopped.wait(self.poll_interval):
+                    break
+                paths = list(self.roots)
+            else:
+                self._wakeup.wait()
+                if self._stopped.is_set():
+                    break
+                # Редактор обычно пишет файл несколькими операциями
+                time.sleep(self.debounce)
+                with self._dirty_lock:
+                    self._wakeup.clear()
+                    paths = sorted(self._dirty)
+                    self._dirty.clear()
+            
+            changes = self._collect(paths)
+            if not changes:
+                continue
+            for callback in self._subscribers:
+                try:
+                    callback(changes)
+                except Exception as e:
+                    print(f"⚠️ File change handler failed: {e}")
+    
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._observer is not None:
+            self._observer.stop()
+
+file_watcher = None
+html_index = None  # FileIndex шаблонов, пока наблюдатель не запущен - None
+template_index = None  # FileIndex всех файлов templates/ (маршруты robots.txt и т.п.)
+asset_index = None  # FileIndex ассетов
+
+def _relative_name(path, root):
+    """Путь файла относительно папки в виде 'a/b.html', None если файл вне папки"""
+    try:
+        return Path(path).relative_to(os.path.abspath(root)).as_posix()
+    except ValueError:
+        return None
+
 def get_all_html_files():
-    """Рекурсивно получить все HTML файлы"""
+    """Все HTML шаблоны (из индекса наблюдателя или обходом папки)"""
+    if html_index is not None:
+        return list(html_index.sorted())
     html_files = []
     if TEMPLATES_DIR.exists():
         for html_file in TEMPLATES_DIR.rglob('*.html'):
             relative_path = html_file.relative_to(TEMPLATES_DIR)
-            html_files.append(str(relative_path))
+            html_files.append(relative_path.as_posix())
     return sorted(html_files)
 
 def get_all_asset_files():
-    """Рекурсивно получить все файлы из assets"""
+    """Все файлы из assets (из индекса наблюдателя или обходом папки)"""
+    if asset_index is not None:
+        return list(asset_index.sorted())
     asset_files = []
     if ASSETS_DIR.exists():
         for asset_file in ASSETS_DIR.rglob('*'):
-            if asset_file.is_file():
+            if asset_file.is_file() and not is_precompressed_variant(asset_file):
                 relative_path = asset_file.relative_to(ASSETS_DIR)
-                asset_files.append(str(relative_path))
+                asset_files.append(relative_path.as_posix())
     return sorted(asset_files)
 
-@app.route('/')
-def index():
-    """Главная страница - сразу отдает index.html"""
-    # Проверяем, есть ли index.html
-    if (TEMPLATES_DIR / 'index.html').exists():
-        return render_template('index.html')
+def _scene_file_sets():
+    """Множества шаблонов и ассетов для разбора сцен"""
+    if html_index is not None:
+        return html_index, asset_index
+    return set(get_all_html_files()), set(get_all_asset_files())
+
+def start_file_watcher():
+    """Индексы шаблонов и ассетов, обновляемые наблюдателем"""
+    global file_watcher, html_index, template_index, asset_index
+    watcher = FileWatcher([TEMPLATES_DIR, ASSETS_DIR])
+    watcher.scan()
+    
+    template_index = FileIndex(_relative_name(path, TEMPLATES_DIR) for path in watcher.files(TEMPLATES_DIR))
+    html_index = FileIndex(name for name in template_index if name.endswith('.html'))
+    asset_index = FileIndex(
+        _relative_name(path, ASSETS_DIR) for path in watcher.files(ASSETS_DIR)
+        if not is_precompressed_variant(path)
+    )
+    
+    # ETag ассетов считаются заранее, а не в потоке первого запроса
+    for asset in asset_index:
+        schedule_asset_hash(asset)
+    
+    watcher.subscribe(on_project_files_changed)
+    watcher.start()
+    file_watcher = watcher
+    return watcher
+
+def on_project_files_changed(changes):
+    """Применение изменений файлов к индексам, маршрутам и кэшам"""
+    changed_scenes = set()
+    rebuild_manifest = False
+    route_keys = set()
+    
+    for kind, path in changes:
+        template = _relative_name(path, TEMPLATES_DIR)
+        if template is not None:
+            if kind == 'deleted':
+                template_index.discard(template)
+            else:
+                template_index.add(template)
+            route_keys.add(template)
+            if template.endswith('.html'):
+                if kind == 'deleted':
+                    html_index.discard(template)
+                else:
+                    html_index.add(template)
+                if kind == 'modified':
+                    changed_scenes.add(template)
+                else:
+                    # Появилась или пропала сцена - меняются переходы других сцен
+                    rebuild_manifest = True
+                route_keys.add(template[:-len('.html')])
+            _invalidate_rendered(path)
+            continue
+        
+        asset = _relative_name(path, ASSETS_DIR)
+        if asset is None or is_precompressed_variant(path):
+            continue
+        if kind == 'deleted':
+            asset_index.discard(asset)
+        else:
+            asset_index.add(asset)
+        if kind != 'modified':
+            rebuild_manifest = True
+        _etag_cache.pop(asset, None)
+        if kind != 'deleted':
+            schedule_asset_hash(asset)
+        route_keys.add(asset)
+        _invalidate_rendered(path)
+    
+    for key in route_keys:
+        _refresh_route(key)
+    
+    if rebuild_manifest:
+        build_scene_manifest()
+    else:
+        html_files, asset_files = _scene_file_sets()
+        for scene in changed_scenes:
+            entry = scan_scene(scene, html_files, asset_files)
+            if entry is not None:
+                scene_manifest[scene] = entry
+    
+    # Аудио расширения обновляют свои индексы
+    if ext_manager is not None:
+        ext_manager.notify_files_changed(changes)
+
+# ====== Манифест сцен: ассеты, звуки и переходы каждой сцены ======
+
+URL_ATTR_RE = re.compile(r"""(?:src|href|poster|data-src|data-href)\s*=\s*["']([^"']+)["']""", re.IGNORECASE)
+CSS_URL_RE = re.compile(r"""url\(\s*["']?([^"')]+)["']?\s*\)""", re.IGNORECASE)
+ASSET_STRING_RE = re.compile(r"""["'](/assets/[^"']+)["']""")
+JS_NAV_RE = re.compile(r"""(?:location(?:\.href)?\s*=|location\.(?:assign|replace)\()\s*["']([^"']+)["']""")
+SOUND_RE = re.compile(r"""(?:["']?sound["']?\s*:\s*|data-sound\s*=\s*)["']([^"']+)["']""")
+
+PREFETCH_DEPTH = 1  # Сколько переходов вперед предзагружать
+MAX_PREFETCH_LINKS = 50
+# Не попадают в Link: аудио играет микшер (у него своя предзагрузка),
+# видео браузер скачал бы целиком на каждый рендер сцены
+PREFETCH_SKIP_DIRS = ('audio/', 'video/')
+PREFETCH_SKIP_EXTENSIONS = {'.mp3', '.ogg', '.wav', '.flac', '.m4a', '.mp4', '.webm', '.mkv', '.mov', '.avi'}
+
+NO_CACHE_MARKER = '{# no-cache #}'  # Шаблон с этой строкой рендерится на каждый запрос
+
+scene_manifest = {}  # {сцена: {'mtime', 'assets', 'audio', 'links', 'templates', 'cacheable'}}
+
+def _normalize_ref(url, scene):
+    """Путь ссылки относительно корня сервера, None для внешних ссылок"""
+    url = url.strip()
+    if not url or url.startswith(('#', '//', 'data:', 'javascript:', 'mailto:')) or '://' in url:
+        return None
+    url = url.split('#', 1)[0].split('?', 1)[0]
+    if not url.startswith('/'):
+        # Относительная ссылка разрешается от папки текущей сцены
+        url = posixpath.join('/', posixpath.dirname(scene), url)
+    path = posixpath.normpath(url).lstrip('/')
+    # Корень сервера отдает index.html
+    return path or 'index.html'
+
+def _template_dependencies(scene, text):
+    """Шаблоны, подключаемые через extends/include/import (рекурсивно)
+    
+    None - если имя шаблона вычисляется динамически или шаблон не разбирается.
+    """
+    dependencies = set()
+    pending = [text]
+    while pending:
+        try:
+            names = list(jinja_meta.find_referenced_templates(app.jinja_env.parse(pending.pop())))
+        except TemplateSyntaxError:
+            return None
+        for name in names:
+            if name is None:
+                return None
+            if name in dependencies or name == scene:
+                continue
+            dependencies.add(name)
+            try:
+                pending.append((TEMPLATES_DIR / name).read_text(encoding='utf-8', errors='ignore'))
+            except OSError:
+                return None
+    return sorted(dependencies)
+
+def scan_scene(scene, html_files, asset_files):
+    """Разбор шаблона сцены: ассеты, звуки и ссылки на другие сцены"""
+    template_path = TEMPLATES_DIR / scene
+    try:
+        text = template_path.read_text(encoding='utf-8', errors='ignore')
+        mtime = template_path.stat().st_mtime_ns
+    except OSError:
+        return None
+    
+    assets, audio, links = set(), set(), set()
+    refs = URL_ATTR_RE.findall(text) + CSS_URL_RE.findall(text) + ASSET_STRING_RE.findall(text)
+    for ref in refs + JS_NAV_RE.findall(text):
+        path = _normalize_ref(ref, scene)
+        if not path:
+            continue
+        
+        asset = path[len('assets/'):] if path.startswith('assets/') else path
+        if asset in asset_files:
+            assets.add(asset)
+            if asset.startswith('audio/'):
+                # Имя звука - путь внутри audio без расширения
+                audio.add(posixpath.splitext(asset[len('audio/'):])[0])
+            continue
+        
+        for candidate in (f"{path}.html", path):
+            if candidate in html_files and candidate != scene:
+                links.add(candidate)
+                break
+    
+    audio.update(SOUND_RE.findall(text))
+    templates = _template_dependencies(scene, text)
+    return {
+        'mtime': mtime,
+        'assets': sorted(assets),
+        'audio': sorted(audio),
+        'links': sorted(links),
+        'templates': templates or [],
+        'cacheable': templates is not None and NO_CACHE_MARKER not in text
+    }
+
+def build_scene_manifest():
+    """Построение графа сцен по всем шаблонам"""
+    global scene_manifest
+    html_files, asset_files = _scene_file_sets()
+    
+    manifest = {}
+    for scene in html_files:
+        entry = scan_scene(scene, html_files, asset_files)
+        if entry is not None:
+            manifest[scene] = entry
+    scene_manifest = manifest
+    return manifest
+
+def get_scene_entry(scene):
+    """Запись манифеста; сцена пересканируется, если шаблон изменился"""
+    entry = scene_manifest.get(scene)
+    if entry is not None and file_watcher is not None:
+        # Изменения шаблонов применяет наблюдатель
+        return entry
+    try:
+        mtime = (TEMPLATES_DIR / scene).stat().st_mtime_ns
+    except OSError:
+        return None
+    if entry is None or entry['mtime'] != mtime:
+        entry = scan_scene(scene, *_scene_file_sets())
+        if entry is not None:
+            scene_manifest[scene] = entry
+    return entry
+
+def get_next_scenes(scene, depth=PREFETCH_DEPTH):
+    """Сцены, достижимые из текущей за depth переходов"""
+    reachable = []
+    frontier = [scene]
+    seen = {scene}
+    for _ in range(depth):
+        next_frontier = []
+        for current in frontier:
+            entry = scene_manifest.get(current)
+            for link in (entry['links'] if entry else []):
+                if link not in seen:
+                    seen.add(link)
+                    reachable.append(link)
+                    next_frontier.append(link)
+        frontier = next_frontier
+    return reachable
+
+# ====== Кэш рендера статических сцен ======
+
+_render_cache = {}  # {сцена: ({путь зависимости: mtime_ns}, html)}
+
+def _dependency_mtimes(paths):
+    """mtime файлов-зависимостей; None для отсутствующих"""
+    mtimes = {}
+    for path in paths:
+        try:
+            mtimes[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            mtimes[path] = None
+    return mtimes
+
+def render_cached(template_name, entry):
+    """HTML сцены из кэша, если шаблон и его зависимости не менялись
+    
+    Зависимости - сам шаблон, подключаемые шаблоны и ассеты из asset_url().
+    Шаблоны с {# no-cache #} рендерятся каждый раз.
+    """
+    if entry is None or not entry['cacheable']:
+        return render_template(template_name)
+    
+    cached = _render_cache.get(template_name)
+    if cached is not None:
+        # С наблюдателем устаревшие записи удаляются в _invalidate_rendered
+        if file_watcher is not None or _dependency_mtimes(cached[0]) == cached[0]:
+            return cached[1]
+    
+    # mtime шаблонов снимаются до рендера: правка во время рендера не закэшируется
+    template_paths = [os.path.abspath(TEMPLATES_DIR / name) for name in [template_name] + entry['templates']]
+    dependencies = _dependency_mtimes(template_paths)
+    g.asset_deps = set()
+    try:
+        html = render_template(template_name)
+        dependencies.update(_dependency_mtimes(os.path.abspath(ASSETS_DIR / asset) for asset in g.asset_deps))
+    finally:
+        g.asset_deps = None
+    _render_cache[template_name] = (dependencies, html)
+    return html
+
+def _invalidate_rendered(path):
+    """Удаление из кэша рендера сцен, зависящих от файла"""
+    for scene, (dependencies, _) in list(_render_cache.items()):
+        if path in dependencies:
+            _render_cache.pop(scene, None)
+
+def render_scene(template_name):
+    """Рендер сцены с предзагрузкой ресурсов следующих сцен"""
+    entry = get_scene_entry(template_name)
+    response = make_response(render_cached(template_name, entry))
+    
+    next_scenes = get_next_scenes(template_name)
+    if not next_scenes:
+        return response
+    
+    # Браузер заранее кладет ресурсы следующих сцен в HTTP кэш
+    links = []
+    sounds = []
+    for scene in next_scenes:
+        entry = scene_manifest.get(scene)
+        if entry is None:
+            continue
+        links.append(f"</{scene[:-len('.html')] if scene.endswith('.html') else scene}>; rel=prefetch")
+        links.extend(
+            f"</assets/{asset}>; rel=prefetch" for asset in entry['assets']
+            if not asset.startswith(PREFETCH_SKIP_DIRS)
+            and posixpath.splitext(asset)[1].lower() not in PREFETCH_SKIP_EXTENSIONS
+        )
+        sounds.extend(entry['audio'])
+    if links:
+        response.headers['Link'] = ', '.join(links[:MAX_PREFETCH_LINKS])
+    
+    # Звуки следующих сцен декодируются заранее в кэш микшера
+    if sounds and ext_manager is not None:
+        ext_manager.prefetch_sounds(sounds)
+    
+    return response
+
+# ====== Таблица маршрутов: URL -> шаблон или ассет ======
+
+route_table = {}  # {путь URL: ('template' | 'asset', имя файла)}
+
+def _probe_route(path):
+    """Поиск файла для URL на диске: шаблон path.html, шаблон path, ассет"""
+    if (TEMPLATES_DIR / f"{path}.html").is_file():
+        return ('template', f"{path}.html")
+    if (TEMPLATES_DIR / path).is_file():
+        return ('template', path)
+    if (ASSETS_DIR / path).is_file():
+        return ('asset', path)
+    return None
+
+def build_route_table():
+    """Таблица маршрутов по всем шаблонам и ассетам (приоритеты как в _probe_route)"""
+    global route_table
+    table = {}
+    for asset in get_all_asset_files():
+        table[asset] = ('asset', asset)
+    # Остальные файлы шаблонов известны только с наблюдателем, без него их найдет _probe_route
+    for template in template_index or ():
+        table[template] = ('template', template)
+    html_files = get_all_html_files()
+    for scene in html_files:
+        table[scene] = ('template', scene)
+    for scene in html_files:
+        table[scene[:-len('.html')]] = ('template', scene)
+    route_table = table
+    return table
+
+def _refresh_route(path):
+    """Пересчет маршрута по индексам файлов после изменения (без обращений к диску)"""
+    if f"{path}.html" in html_index:
+        route_table[path] = ('template', f"{path}.html")
+    elif path in template_index:
+        route_table[path] = ('template', path)
+    elif path in asset_index:
+        route_table[path] = ('asset', path)
+    else:
+        route_table.pop(path, None)
+
+def resolve_route(path):
+    """Маршрут для URL: один поиск в словаре, диск проверяется только при промахе"""
+    route = route_table.get(path)
+    if route is None and file_watcher is None:
+        route = _probe_route(path)
+        if route is not None:
+            route_table[path] = route
+    return route
+
+# ====== Список файлов проекта: постранично, с фильтром ======
+
+LISTING_PAGE_SIZE = 100
+MAX_LISTING_PAGE_SIZE = 1000
+MAX_LISTING_CACHE = 64
+LISTING_CHECK_INTERVAL = 1.0  # Без наблюдателя папка проверяется не чаще раза в секунду
+
+_listing_cache = OrderedDict()  # {(вид, фильтр): (исходный список, совпадения)}
+_listing_lock = threading.Lock()
+_listing_sources = {}  # Без наблюдателя: {вид: (подпись папок, время проверки, список)}
+
+def _directory_signature(root):
+    """mtime всех папок под root: меняется при добавлении, удалении и переименовании файлов"""
+    signature = set()
+    stack = [str(root)]
+    while stack:
+        path = stack.pop()
+        try:
+            signature.add((path, os.stat(path).st_mtime_ns))
+            with os.scandir(path) as entries:
+                stack.extend(entry.path for entry in entries if entry.is_dir(follow_symlinks=False))
+        except OSError:
+            continue
+    return frozenset(signature)
+
+def _listing_source(kind):
+    """Отсортированный список файлов: один объект, пока папка не изменилась
     
-    # Если index.html нет, показываем навигацию
-    templates = get_all_html_files()
-    assets = get_all_asset_files()
+    С наблюдателем - список индекса, без него - кэш с проверкой по mtime папок.
+    """
+    index = html_index if kind == 'templates' else asset_index
+    if index is not None:
+        return index.sorted()
+    
+    root, collect = (TEMPLATES_DIR, get_all_html_files) if kind == 'templates' else (ASSETS_DIR, get_all_asset_files)
+    now = time.monotonic()
+    cached = _listing_sources.get(kind)
+    if cached is not None and now - cached[1] < LISTING_CHECK_INTERVAL:
+        return cached[2]
+    
+    signature = _directory_signature(root)
+    if cached is not None and cached[0] == signature:
+        _listing_sources[kind] = (signature, now, cached[2])
+        return cached[2]
+    files = collect()
+    _listing_sources[kind] = (signature, now, files)
+    return files
+
+def list_project_files(kind, query='', page=1, per_page=LISTING_PAGE_SIZE, extensions=None):
+    """Страница списка шаблонов или ассетов
+    
+    query - слова через пробел, каждое должно входить в путь (без учета регистра),
+    extensions - допустимые расширения ('png', 'jpg'). Отфильтрованные списки
+    кэшируются, пока индекс папки не изменится.
+    """
+    source = _listing_source(kind)
+    terms = tuple(query.lower().split())
+    suffixes = tuple(sorted(f".{ext.lower().lstrip('.')}" for ext in extensions or ()))
+    key = (kind, terms, suffixes)
+    
+    with _listing_lock:
+        cached = _listing_cache.get(key)
+        if cached is not None and cached[0] is source:
+            _listing_cache.move_to_end(key)
+            matches = cached[1]
+        else:
+            matches = source
+            if terms or suffixes:
+                matches = [
+                    name for name in source
+                    if all(term in name.lower() for term in terms)
+                    and (not suffixes or name.lower().endswith(suffixes))
+                ]
+            _listing_cache[key] = (source, matches)
+            if len(_listing_cache) > MAX_LISTING_CACHE:
+                _listing_cache.popitem(last=False)
     
-    return render_template_string("""
+    per_page = max(1, min(per_page, MAX_LISTING_PAGE_SIZE))
+    pages = max(1, -(-len(matches) // per_page))
+    page = max(1, min(page, pages))
+    start = (page - 1) * per_page
+    return {
+        'kind': kind,
+        'query': query,
+        'total': len(matches),
+        'page': page,
+        'per_page': per_page,
+        'pages': pages,
+        'items': matches[start:start + per_page]
+    }
+
+@app.route('/_runtime/files')
+@app.route('/_runtime/files/<kind>')
+def list_files_api(kind='templates'):
+    """JSON список файлов: /_runtime/files/assets?q=bg&ext=png,jpg&page=2&per_page=50"""
+    if kind not in ('templates', 'assets'):
+        abort(404)
+    extensions = [ext for ext in request.args.get('ext', '').split(',') if ext]
+    return jsonify(list_project_files(
+        kind,
+        request.args.get('q', ''),
+        request.args.get('page', 1, type=int),
+        request.args.get('per_page', LISTING_PAGE_SIZE, type=int),
+        extensions
+    ))
+
+# Шаблон страницы навигации компилируется один раз
+INDEX_PAGE = app.jinja_env.from_string("""
         <!DOCTYPE html>
         <html>
         <head>
@@ -125,6 +1285,16 @@ def index():
                     background: #e6f0ff;
                     text-decoration: none;
                 }
+                .filter { margin-bottom: 20px; }
+                .filter input {
+                    width: 100%;
+                    padding: 8px 12px;
+                    border: 1px solid #ddd;
+                    border-radius: 4px;
+                    font-size: 1em;
+                }
+                .pager { display: flex; align-items: center; gap: 10px; margin-top: 15px; color: #666; }
+                .pager a { display: inline-block; }
                 .count { 
                     background: #0066cc;
                     color: white;
@@ -136,12 +1306,28 @@ def index():
             </style>
         </head>
         <body>
+            {% macro pager(listing, param, other_param, other_page) %}
+                {% if listing.pages > 1 %}
+                <div class="pager">
+                    {% if listing.page > 1 %}
+                    <a href="?q={{ query|urlencode }}&{{ other_param }}={{ other_page }}&{{ param }}={{ listing.page - 1 }}">←</a>
+                    {% endif %}
+                    <span>{{ listing.page }} / {{ listing.pages }}</span>
+                    {% if listing.page < listing.pages %}
+                    <a href="?q={{ query|urlencode }}&{{ other_param }}={{ other_page }}&{{ param }}={{ listing.page + 1 }}">→</a>
+                    {% endif %}
+                </div>
+                {% endif %}
+            {% endmacro %}
             <h1>🚀 Scene Server</h1>
+            <form class="filter" method="get">
+                <input type="search" name="q" value="{{ query }}" placeholder="Фильтр по имени...">
+            </form>
             <div class="container">
                 <div class="column">
-                    <h2>📄 Templates <span class="count">{{ templates|length }}</span></h2>
+                    <h2>📄 Templates <span class="count">{{ templates.total }}</span></h2>
                     <ul>
-                        {% for template in templates %}
+                        {% for template in templates['items'] %}
                         <li>
                             <a href="/{{ template.replace('.html', '') }}">
                                 📝 {{ template.replace('.html', '') }}
@@ -149,11 +1335,12 @@ def index():
                         </li>
                         {% endfor %}
                     </ul>
+                    {{ pager(templates, 'templates_page', 'assets_page', assets.page) }}
                 </div>
                 <div class="column">
-                    <h2>📁 Assets <span class="count">{{ assets|length }}</span></h2>
+                    <h2>📁 Assets <span class="count">{{ assets.total }}</span></h2>
                     <ul>
-                        {% for asset in assets %}
+                        {% for asset in assets['items'] %}
                         <li>
                             <a href="/assets/{{ asset }}" target="_blank">
                                 📎 {{ asset }}
@@ -161,46 +1348,55 @@ def index():
                         </li>
                         {% endfor %}
                     </ul>
+                    {{ pager(assets, 'assets_page', 'templates_page', templates.page) }}
                 </div>
             </div>
         </body>
         </html>
-    """, templates=templates, assets=assets)
+    """)
+
+@app.route('/')
+def index():
+    """Главная страница - сразу отдает index.html"""
+    # Проверяем, есть ли index.html
+    if resolve_route('index.html') is not None:
+        return render_scene('index.html')
+    
+    # Если index.html нет, показываем навигацию (постранично)
+    query = request.args.get('q', '')
+    return INDEX_PAGE.render(
+        query=query,
+        templates=list_project_files('templates', query, request.args.get('templates_page', 1, type=int)),
+        assets=list_project_files('assets', query, request.args.get('assets_page', 1, type=int))
+    )
 
 @app.route('/<path:path>')
 def serve_template_or_asset(path):
-    """Умный роутинг: пробуем шаблон, потом assets"""
-    # Сначала пробуем как шаблон
-    html_path = f"{path}.html"
-    if (TEMPLATES_DIR / html_path).exists():
-        try:
-            return render_template(html_path)
-        except Exception as e:
-            return f"Template error: {e}", 500
+    """Умный роутинг: шаблон или asset по таблице маршрутов"""
+    route = resolve_route(path)
+    if route is None:
+        abort(404)
     
-    # Если нет расширения .html, пробуем прямой путь
-    if (TEMPLATES_DIR / path).exists():
-        try:
-            return render_template(path)
-        except Exception as e:
-            return f"Template error: {e}", 500
-    
-    # Если это не шаблон, пробуем как asset
-    if (ASSETS_DIR / path).exists():
-        return send_from_directory(str(ASSETS_DIR), path)
+    kind, filename = route
+    if kind == 'asset':
+        return send_asset(filename)
     
-    abort(404)
+    if file_watcher is None and not (TEMPLATES_DIR / filename).is_file():
+        # Файл удален после построения таблицы
+        route_table.pop(path, None)
+        abort(404)
+    try:
+        return render_scene(filename)
+    except Exception as e:
+        return f"Template error: {e}", 500
 
 @app.route('/assets/<path:filename>')
 def serve_static(filename):
     """Явный маршрут для assets"""
-    if (ASSETS_DIR / filename).exists():
-        return send_from_directory(str(ASSETS_DIR), filename)
-    abort(404)
+    return send_asset(filename)
 
-@app.errorhandler(404)
-def page_not_found(e):
-    return render_template_string("""
+# Шаблон страницы 404 компилируется один раз
+NOT_FOUND_PAGE = app.jinja_env.from_string("""
         <!DOCTYPE html>
         <html>
         <head>
@@ -235,7 +1431,11 @@ def page_not_found(e):
             </div>
         </body>
         </html>
-    """), 404
+    """)
+
+@app.errorhandler(404)
+def page_not_found(e):
+    return NOT_FOUND_PAGE.render(), 404
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -248,8 +1448,9 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(self.web_view)
         
         # Загружаем index.html напрямую, если он существует
+        # (в режиме одного порта - через сервер, чтобы сцены были с тем же origin)
         index_path = TEMPLATES_DIR / 'index.html'
-        if index_path.exists():
+        if index_path.exists() and EXTENSION_API_BASE:
             self.web_view.load(QUrl.fromLocalFile(str(index_path)))
         else:
             self.web_view.load(QUrl("http://127.0.0.1:5000"))
@@ -265,30 +1466,75 @@ def run_flask():
     print(f"Base dir: {BASE_DIR}")
     print(f"Templates: {TEMPLATES_DIR}")
     print(f"Assets: {ASSETS_DIR}")
+    if WATCH_FILES:
+        start_file_watcher()
     print(f"Found {len(get_all_html_files())} templates")
     print(f"Found {len(get_all_asset_files())} assets")
+    manifest = build_scene_manifest()
+    print(f"Routes: {len(build_route_table())}")
+    print(f"Scene graph: {len(manifest)} scenes, {sum(len(e['links']) for e in manifest.values())} transitions")
     print("=" * 50)
     
-    app.run(host='127.0.0.1', port=5000, debug=False, use_reloader=False)
+    run_wsgi_server(app, host='127.0.0.1', port=5000, **SERVER_OPTIONS)
 
-def run_extensions():
-        """Запуск менеджера расширений"""
+def run_extensions(shared=False):
+        """Запуск менеджера расширений
+        
+        shared=True - расширения монтируются в приложение сцен (один порт)
+        """
+        global ext_manager
         extensions_dir = BASE_DIR / 'data' / 'extensions'
-        ext_manager = ExtensionManager(extensions_dir, BASE_DIR)
-        ext_manager.start_server()
+        if shared:
+            ext_manager = ExtensionManager(extensions_dir, BASE_DIR, app=app, port=5000,
+                                           lazy=LAZY_EXTENSIONS, isolate=ISOLATE_EXTENSIONS)
+        else:
+            ext_manager = ExtensionManager(extensions_dir, BASE_DIR,
+                                           lazy=LAZY_EXTENSIONS, isolate=ISOLATE_EXTENSIONS)
+        ext_manager.start_server(**SERVER_OPTIONS)
 
 
 if __name__ == '__main__':
     if len(sys.argv) > 1 and sys.argv[1] == '--newproject':
         create_project_structure()
+    elif len(sys.argv) > 1 and sys.argv[1] == '--build-audio-cache':
+        build_audio_cache()
+    elif len(sys.argv) > 1 and sys.argv[1] == '--precompress':
+        precompress_assets()
+    elif len(sys.argv) > 2 and sys.argv[1] == '--bench-media':
+        SERVER_OPTIONS['production'] = '--production' in sys.argv
+        SERVER_OPTIONS['threads'] = int(get_arg_value('--threads', SERVER_OPTIONS['threads']))
+        bench_media(sys.argv[2],
+                    clients=int(get_arg_value('--clients', 8)),
+                    requests_per_client=int(get_arg_value('--requests', 50)))
+    elif len(sys.argv) > 2 and sys.argv[1] == '--bench-extension':
+        ExtensionManager(BASE_DIR / 'data' / 'extensions', BASE_DIR).benchmark_isolation(
+            sys.argv[2],
+            path=get_arg_value('--path', None),
+            requests=int(get_arg_value('--requests', 1000)))
     else:
+        SERVER_OPTIONS['production'] = '--production' in sys.argv
+        SERVER_OPTIONS['threads'] = int(get_arg_value('--threads', SERVER_OPTIONS['threads']))
+        SERVER_OPTIONS['keep_alive'] = int(get_arg_value('--keep-alive', SERVER_OPTIONS['keep_alive']))
+        ASSET_MAX_AGE = int(get_arg_value('--asset-max-age', ASSET_MAX_AGE))
+        WATCH_FILES = '--no-watch' not in sys.argv
+        LAZY_EXTENSIONS = '--lazy-extensions' in sys.argv
+        ISOLATE_EXTENSIONS = '--isolate-extensions' in sys.argv
+        single_port = '--single-port' in sys.argv
+        
+        if single_port:
+            # Маршруты менеджера монтируются до старта сервера сцен,
+            # сами расширения загружаются в фоне
+            EXTENSION_API_BASE = ''
+            run_extensions(shared=True)
+        
         # Запускаем Flask в отдельном потоке
         flask_thread = threading.Thread(target=run_flask, daemon=True)
         flask_thread.start()
         
-        # Запускаем менеджер расширений в отдельном потоке
-        extensions_thread = threading.Thread(target=run_extensions, daemon=True)
-        extensions_thread.start()
+        if not single_port:
+            # Запускаем менеджер расширений в отдельном потоке
+            extensions_thread = threading.Thread(target=run_extensions, daemon=True)
+            extensions_thread.start()
         
         # Запускаем Qt приложение
         qt_app = QApplication(sys.argv)